@@ -0,0 +1,68 @@
+import os
+import sys
+
+SCALED_DIR = "app/resources/scaled"
+
+# Long-edge sizes in pixels produced by the asset build for each source image, roughly the 1x/2x/3x
+# density buckets of the size the UI actually draws it at
+ASSET_VARIANTS = {
+    "app/resources/LOGO_2.png": (64, 128, 192),
+    "app/resources/Loading.jpg": (640, 960, 1280),
+}
+
+
+# # PyInstaller 会在打包后将资源复制到临时路径中运行，因此还需要在代码中这样处理资源路径（建议统一处理）：
+def resource_path(relative_path):
+    """获取资源文件路径（兼容开发和 PyInstaller）"""
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, relative_path)
+    return os.path.join(os.path.abspath("."), relative_path)
+
+
+SPLASH_IMAGE_PATH = r"app/resources/Loading.jpg"
+ICON_PATH = r"app/resources/LOGO_2.png"
+INFO_ICON_PATH = r"app/resources/info_icon.jpg"
+
+
+def variant_path(relative_path, size):
+    """Returns the relative path of the pre-scaled copy of relative_path with the given long edge."""
+    stem, ext = os.path.splitext(os.path.basename(relative_path))
+    return f"{SCALED_DIR}/{stem}_{size}{ext}"
+
+
+def scaled_asset(relative_path, target_px):
+    """Returns the path of the smallest pre-scaled variant covering target_px, or of the original.
+
+    Decoding a pre-scaled file avoids loading full-resolution textures just to draw them small.
+    """
+    for size in ASSET_VARIANTS.get(relative_path, ()):
+        if size >= target_px:
+            path = resource_path(variant_path(relative_path, size))
+            if os.path.exists(path):
+                return path
+            break
+    return resource_path(relative_path)
+
+
+def build_assets(root="."):
+    """Writes every variant in ASSET_VARIANTS below SCALED_DIR. Needs Pillow (build time only)."""
+    from PIL import Image
+
+    os.makedirs(os.path.join(root, SCALED_DIR), exist_ok=True)
+    for relative_path, sizes in ASSET_VARIANTS.items():
+        with Image.open(os.path.join(root, relative_path)) as source:
+            source = source.convert("RGB")
+            for size in sizes:
+                scale = size / max(source.size)
+                image = source.resize((round(source.width * scale), round(source.height * scale)),
+                                      Image.LANCZOS)
+                output = os.path.join(root, variant_path(relative_path, size))
+                if output.endswith(".jpg"):
+                    image.save(output, quality=85, optimize=True, progressive=True)
+                else:
+                    image.save(output, optimize=True)
+                print(f"{output}: {image.size[0]}x{image.size[1]}, {os.path.getsize(output)} bytes")
+
+
+if __name__ == "__main__":
+    build_assets()
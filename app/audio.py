@@ -0,0 +1,186 @@
+import os
+import tempfile
+import time
+import wave
+from array import array
+
+import numpy as np
+
+from app.assets import resource_path
+from app.scheduler import timing_summary
+
+SAMPLE_RATE = 22050
+TONE_DURATION = 0.4
+SOUND_DIR = "app/resources/sounds"  # Optional recordings named 1.wav, 2.wav, ... replace the built-in tones
+# Semitone offsets from C4 for the built-in tones: a major scale, so neighbouring stimuli stay distinguishable
+_TONE_STEPS = (0, 2, 4, 5, 7, 9, 11, 12, 14, 16, 17, 19, 21, 23, 24)
+
+
+def synthesize_tone(index, sample_rate=SAMPLE_RATE, duration=TONE_DURATION):
+    """Returns the built-in tone for stimulus index as mono int16 PCM."""
+    frequency = 261.63 * 2 ** (_TONE_STEPS[index % len(_TONE_STEPS)] / 12) * 2 ** (index // len(_TONE_STEPS))
+    t = np.arange(int(sample_rate * duration)) / sample_rate
+    envelope = np.minimum(1.0, np.minimum(t, duration - t) / 0.01)  # 10 ms fades avoid clicks
+    return (np.sin(2 * np.pi * frequency * t) * envelope * 0.6 * 32767).astype(np.int16)
+
+
+def decode_wav(path, sample_rate=SAMPLE_RATE):
+    """Decodes a 16-bit PCM WAV file to mono int16 at sample_rate."""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported.")
+        channels, rate = f.getnchannels(), f.getframerate()
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2").reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate:
+        pcm = np.interp(np.arange(int(len(pcm) * sample_rate / rate)) * rate / sample_rate, np.arange(len(pcm)), pcm)
+    return pcm.astype(np.int16)
+
+
+def load_sound_bank(num_stimuli, sample_rate=SAMPLE_RATE):
+    """Returns one decoded PCM buffer per audio stimulus, from SOUND_DIR when present, else synthesized."""
+    bank = []
+    for index in range(num_stimuli):
+        path = resource_path(f"{SOUND_DIR}/{index + 1}.wav")
+        bank.append(decode_wav(path, sample_rate) if os.path.exists(path) else synthesize_tone(index, sample_rate))
+    return bank
+
+
+def write_wav(path, pcm, sample_rate=SAMPLE_RATE):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.asarray(pcm, dtype="<i2").tobytes())
+
+
+class NullAudioBackend:
+    """Discards audio; keeps the play calls so scheduling can be checked headlessly."""
+
+    def __init__(self):
+        self.played = []
+
+    def load(self, bank, sample_rate):
+        self.played = []
+
+    def play(self, index, timestamp):
+        self.played.append((timestamp, index))
+
+    def close(self):
+        pass
+
+
+class WavFileAudioBackend(NullAudioBackend):
+    """Renders every play call at its timestamp into a single WAV file on close()."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.bank = []
+        self.sample_rate = SAMPLE_RATE
+
+    def load(self, bank, sample_rate):
+        super().load(bank, sample_rate)
+        self.bank = bank
+        self.sample_rate = sample_rate
+
+    def close(self):
+        if not self.played:
+            return
+        start = self.played[0][0]
+        offsets = [int(round((timestamp - start) * self.sample_rate)) for timestamp, _ in self.played]
+        mix = np.zeros(max(o + len(self.bank[i]) for o, (_, i) in zip(offsets, self.played)), dtype=np.int32)
+        for offset, (_, index) in zip(offsets, self.played):
+            mix[offset:offset + len(self.bank[index])] += self.bank[index]
+        write_wav(self.path, np.clip(mix, -32768, 32767), self.sample_rate)
+
+
+class KivyAudioBackend:
+    """Plays the bank through kivy.core.audio with every sound loaded up front.
+
+    Kivy only loads sounds from files, so the decoded bank is written once to a cache directory and each
+    buffer is loaded into its own Sound. A silent play at load time opens the output device before the
+    first stimulus.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "nback_sounds")
+        self.sounds = []
+        self._loaded = None  # (bank, sample_rate) currently loaded
+
+    def load(self, bank, sample_rate):
+        from kivy.core.audio import SoundLoader
+
+        if self._loaded is not None and self._loaded[0] is bank and self._loaded[1] == sample_rate:
+            return  # Same decoded bank as the previous session: its sounds are still loaded
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.close()
+        for index, pcm in enumerate(bank):
+            path = os.path.join(self.cache_dir, f"stimulus_{index}_{sample_rate}.wav")
+            write_wav(path, pcm, sample_rate)
+            self.sounds.append(SoundLoader.load(path))
+        if self.sounds and self.sounds[0]:
+            warm = self.sounds[0]
+            warm.volume = 0
+            warm.play()
+            warm.stop()
+            warm.volume = 1
+        self._loaded = (bank, sample_rate)
+
+    def play(self, index, timestamp):
+        sound = self.sounds[index]
+        if sound:
+            if sound.state == 'play':
+                sound.stop()
+            sound.play()
+
+    def close(self):
+        for sound in self.sounds:
+            if sound:
+                sound.unload()
+        self.sounds = []
+        self._loaded = None
+
+
+class AudioStimulusEngine:
+    """Plays audio stimuli from a pre-decoded sound bank and measures when they are issued against the
+    visual onset.
+
+    prepare() decodes every stimulus once per session, so nothing is loaded on the trial path. play() takes
+    the monotonic time of the matching visual highlight and records how much later the play call to the
+    backend returned into a preallocated array. This is the issue latency: the output latency of the audio
+    device, until the sound is actually heard, is not reported by Kivy's providers and is not included.
+    """
+
+    def __init__(self, backend, sample_rate=SAMPLE_RATE, clock=time.perf_counter):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.bank = []
+        self.issue_latencies = array('d')
+        self._num_played = 0
+
+    def prepare(self, num_stimuli, num_trials, bank=None):
+        """Loads the bank for a session of num_trials trials; reuses the decoded bank when it still fits."""
+        if bank is not None:
+            self.bank = bank
+        elif len(self.bank) != num_stimuli:
+            self.bank = load_sound_bank(num_stimuli, self.sample_rate)
+        self.backend.load(self.bank, self.sample_rate)
+        self.issue_latencies = array('d', bytes(8 * num_trials))
+        self._num_played = 0
+
+    def play(self, stimulus, visual_onset=None):
+        """Starts the sound for stimulus; returns the time the play call was issued on the monotonic clock."""
+        self.backend.play(stimulus, self.clock())
+        issued = self.clock()
+        if visual_onset is not None and self._num_played < len(self.issue_latencies):
+            self.issue_latencies[self._num_played] = issued - visual_onset
+            self._num_played += 1
+        return issued
+
+    def issue_latency_stats(self):
+        """Returns mean, p95 and max time from visual onset to the audio play call returning in seconds, or None."""
+        return timing_summary(np.frombuffer(self.issue_latencies, dtype=np.float64)[:self._num_played])
+
+    def close(self):
+        self.backend.close()
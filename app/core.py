@@ -1,74 +1,190 @@
+import operator
 import random
+import secrets
+import numpy as np
 
+from app.events import reaction_times
+from app.scoring import NUM_OUTCOMES, ScoreSummary, outcome_codes
+from app.tracing import trace_methods
 
-class NBackGame:
-    def __init__(self, n_value=2, sequence_length=20, num_positions=9, num_audio_stimuli=9):
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+SEED_LIMIT = 1 << 32  # Seeds are 32-bit: that is what the stimulus hash, replays and the session log store
+
+
+def session_seed(seed=None):
+    """Returns seed after checking it is an integer in [0, 2**32), or a fresh random seed if it is None."""
+    if seed is None:
+        return secrets.randbits(32)
+    try:
+        seed = operator.index(seed)
+    except TypeError:
+        raise ValueError(f"Seed must be an integer, got {seed!r}.") from None
+    if not 0 <= seed < SEED_LIMIT:
+        raise ValueError(f"Seed must be between 0 and {SEED_LIMIT - 1}, got {seed}.")
+    return seed
+
+
+def _splitmix64(x):
+    """SplitMix64 finalizer on a uint64 array (wrapping arithmetic)."""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def stimulus_matrix(seed, total_length, num_options=(9, 9)):
+    """Returns the uint8 stimuli of a session with one column per channel; the same seed always yields the
+    same session.
+
+    Each stimulus is a hash of (seed, trial, channel), so any number of sessions can be regenerated in one
+    vectorized call: a scalar seed gives shape (trials, channels), an array of seeds (sessions, trials,
+    channels). num_options holds the number of stimulus options of each channel.
+    """
+    options = np.array(num_options, dtype=np.uint64)
+    num_channels = len(options)
+    seeds = np.asarray(seed, dtype=np.uint64) & np.uint64(0xFFFFFFFF)  # Seeds are 32-bit
+    counters = np.arange(num_channels * total_length, dtype=np.uint64).reshape(total_length, num_channels)
+    bits = _splitmix64((seeds[..., None, None] << np.uint64(32)) | counters) >> np.uint64(32)
+    return ((bits * options) >> np.uint64(32)).astype(np.uint8)  # Multiply-shift maps 32 bits onto [0, n)
+
+
+def session_stimuli(seed, total_length, num_positions=9, num_audio_stimuli=9):
+    """Dual (visual, audio) form of stimulus_matrix()."""
+    return stimulus_matrix(seed, total_length, (num_positions, num_audio_stimuli))
+
+
+def trial_stimulus_row(seed, trial, num_options=(9, 9)):
+    """Returns the stimuli of one trial, equal to stimulus_matrix(seed, ...)[trial], in plain Python."""
+    num_channels = len(num_options)
+    stimuli = []
+    for channel, options in enumerate(num_options):
+        x = (((seed & 0xFFFFFFFF) << 32) | (num_channels * trial + channel)) + 0x9E3779B97F4A7C15 & _MASK64
+        x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+        x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK64
+        stimuli.append((((x ^ (x >> 31)) >> 32) * options) >> 32)
+    return tuple(stimuli)
+
+
+def trial_stimuli(seed, trial, num_positions=9, num_audio_stimuli=9):
+    """Returns (visual, audio) of one trial, equal to session_stimuli(seed, ...)[trial]."""
+    return trial_stimulus_row(seed, trial, (num_positions, num_audio_stimuli))
+
+
+@trace_methods("generate_sequences", "load_sequences", "next_stimuli", "record_responses", category="core")
+class MultiNBackGame:
+    """N-back session over any number of stimulus channels (position, sound, colour, shape, ...).
+
+    Stimuli are held as one (trials, channels) uint8 matrix and responses as one row of bit-packed masks
+    per channel. Each trial is scored with a single vectorized comparison across all channels, so adding
+    a channel widens the arrays instead of adding code paths.
+    """
+
+    # No per-instance __dict__: thousands of sessions are kept in memory during simulation and replay
+    __slots__ = ("n_value", "sequence_length", "num_options", "seed", "stimuli", "current_trial_index", "score",
+                 "_responses", "outcome_counts")
+
+    def __init__(self, n_value=2, sequence_length=20, num_options=(9, 9), seed=None):
         if not 1 <= n_value <= 9:  # Max N commonly up to 9, though 1-5 is typical for training
             raise ValueError("N-value must be between 1 and 9.")
+        num_options = tuple(int(x) for x in num_options)
+        if not num_options or any(not 1 <= x <= 256 for x in num_options):
+            raise ValueError("Need at least one channel, each with between 1 and 256 stimulus options.")
         self.n_value = n_value
         self.sequence_length = sequence_length + n_value  # Ensure enough trials for N-back checks
-        self.num_positions = num_positions  # For visual stimuli (e.g., 3x3 grid)
-        self.num_audio_stimuli = num_audio_stimuli  # For audio stimuli (e.g., digits 1-9 or letters)
+        self.num_options = num_options  # Stimulus options per channel, e.g. 9 grid positions
+        self.seed = session_seed(seed)  # Generated sequences are a pure function of the seed
 
-        self.visual_sequence = []
-        self.audio_sequence = []
+        self.stimuli = np.zeros((0, len(num_options)), dtype=np.uint8)  # One byte per trial and channel
 
         self.current_trial_index = 0  # Index in the sequence
         self.score = 0
+        self._reset_responses()
 
-        self.user_visual_responses_history = []  # Stores user's visual match button presses for each trial
-        self.user_audio_responses_history = []  # Stores user's audio match button presses for each trial
+    @property
+    def num_channels(self):
+        return len(self.num_options)
 
-    def _generate_stimulus(self, num_options):
-        """Generates a single stimulus (either visual position or audio sound)."""
-        return random.randint(0, num_options - 1)
+    def _reset_responses(self):
+        """Allocates fresh bit-packed response masks (one bit per trial and channel) and outcome counters."""
+        # Sized for the whole session up front, so zero-copy views never block a resize. The spare last row
+        # marks the trials whose response was recorded, without a second array per session
+        self._responses = np.zeros((self.num_channels + 1, (self.sequence_length + 7) // 8), dtype=np.uint8)
+        self.outcome_counts = np.zeros((self.num_channels, NUM_OUTCOMES), dtype=np.int32)  # [channel, code]
 
     def generate_sequences(self):
-        """Generates both visual and audio sequences for the game."""
-        self.visual_sequence = [self._generate_stimulus(self.num_positions) for _ in range(self.sequence_length)]
-        self.audio_sequence = [self._generate_stimulus(self.num_audio_stimuli) for _ in range(self.sequence_length)]
+        """Generates the stimuli of every channel from the game's seed, drawing a new seed if it has none."""
+        if self.seed is None:
+            self.seed = session_seed()
+        self._use_sequences(stimulus_matrix(self.seed, self.sequence_length, self.num_options))
+
+    def load_sequences(self, sequences):
+        """Uses pre-generated stimuli, e.g. one row of app.sequences.generate_sequence_batch().
+
+        The stimuli no longer follow from the seed, so seed is set to None: such a session is logged with
+        its stimuli and cannot be encoded as a replay.
+        """
+        self._use_sequences(sequences)
+        self.seed = None
+
+    def _use_sequences(self, sequences):
+        sequences = np.array(sequences, dtype=np.uint8)
+        if sequences.shape != (self.sequence_length, self.num_channels):
+            raise ValueError(f"Expected {self.sequence_length} trials x {self.num_channels} channels, "
+                             f"got {sequences.shape}.")
+        self.stimuli = sequences
         self.current_trial_index = 0
         self.score = 0
-        self.user_visual_responses_history = []
-        self.user_audio_responses_history = []
+        self._reset_responses()
 
     def next_stimuli(self):
-        """Advances to the next trial and returns the current stimuli."""
+        """Advances to the next trial and returns its stimuli, one per channel."""
         if self.current_trial_index < self.sequence_length:
-            visual_stimulus = self.visual_sequence[self.current_trial_index]
-            audio_stimulus = self.audio_sequence[self.current_trial_index]
+            stimuli = tuple(self.stimuli[self.current_trial_index].tolist())
             self.current_trial_index += 1
-            return visual_stimulus, audio_stimulus
-        else:
-            return None, None  # Game over
+            return stimuli
+        return (None,) * self.num_channels  # Game over
 
-    def record_response_and_score(self, visual_match_pressed, audio_match_pressed):
-        """Records the user's response for the *previous* stimulus presentation and scores it."""
-        # This is called *before* presenting the next stimulus, or at the end of a response window.
-        # The response is for the (current_trial_index - 1) stimulus compared to (current_trial_index - 1 - n_value)
+    def record_responses(self, pressed):
+        """Records the match presses (one per channel) for the stimulus just presented and scores them.
 
-        # Store raw button presses for the stimulus that was just shown
-        # (current_trial_index has already advanced for the *next* stimulus to be shown)
-        # So, the response is for trial_idx = self.current_trial_index - 1
+        Called after next_stimuli(), so the response is for trial current_trial_index - 1, compared with
+        the trial n_value positions earlier.
+        """
+        pressed = np.asarray(pressed, dtype=bool)
+        if pressed.shape != (self.num_channels,):
+            raise ValueError(f"Expected one response per channel ({self.num_channels}), got {pressed.shape}.")
 
         # We only score if enough trials have passed to make an N-back comparison
         if self.current_trial_index > self.n_value:
-            # The stimulus just presented was at index: presented_stim_idx = self.current_trial_index - 1
-            # The N-back stimulus to compare against was at index: n_back_stim_idx = presented_stim_idx - self.n_value
-            presented_stim_idx = self.current_trial_index - 1
-            n_back_stim_idx = presented_stim_idx - self.n_value
+            presented = self.current_trial_index - 1
+            actual_match = self.stimuli[presented] == self.stimuli[presented - self.n_value]
+            self.outcome_counts[np.arange(self.num_channels), outcome_codes(actual_match, pressed)] += 1
+            # Hits and correct rejections are correct responses
+            self.score += int(np.count_nonzero(pressed == actual_match))
 
-            actual_visual_match = (self.visual_sequence[presented_stim_idx] == self.visual_sequence[n_back_stim_idx])
-            actual_audio_match = (self.audio_sequence[presented_stim_idx] == self.audio_sequence[n_back_stim_idx])
+        # Bits are indexed by trial, so the masks line up with the stimulus matrix
+        if self.current_trial_index > 0:
+            byte_index, bit = divmod(self.current_trial_index - 1, 8)
+            self._responses[:-1, byte_index] |= pressed.view(np.uint8) << bit
+            self._responses[-1, byte_index] |= 1 << bit
 
-            if visual_match_pressed == actual_visual_match:
-                self.score += 1
-            if audio_match_pressed == actual_audio_match:
-                self.score += 1
+    def stimulus_views(self):
+        """Returns one zero-copy uint8 NumPy view per channel."""
+        return tuple(self.stimuli.T)
 
-        # History for potential later analysis, not directly used by current scoring logic
-        self.user_visual_responses_history.append(visual_match_pressed)
-        self.user_audio_responses_history.append(audio_match_pressed)
+    def packed_response_views(self):
+        """Returns one zero-copy uint8 view of the bit-packed response mask per channel, LSB first."""
+        return tuple(self._responses[:-1])
+
+    def response_masks(self):
+        """Returns the responses unpacked into a bool array of shape (channels, trials presented so far)."""
+        return np.unpackbits(self._responses[:-1], axis=1, count=self.current_trial_index,
+                             bitorder='little').astype(bool)
+
+    def reaction_times(self, events):
+        """Returns (first_press, press_counts) arrays of shape (trials, channels) from a TrialEventBuffer."""
+        return reaction_times(events, self.sequence_length, num_channels=self.num_channels)
 
     def get_current_trial_number(self):
         """Returns the 1-based current trial number being presented."""
@@ -83,12 +199,60 @@ class NBackGame:
         """Returns the current score."""
         return self.score
 
+    def get_score_summary(self):
+        """Returns hits, misses, false alarms, correct rejections, d' and criterion per channel."""
+        return ScoreSummary(self.outcome_counts.copy())
+
     def get_max_possible_score(self):
         """Calculates the maximum possible score for the current game settings."""
-        # Scoring happens for trials from n_value up to sequence_length - 1
-        # Number of scorable trials = sequence_length - n_value
-        # Each scorable trial has two components (visual and audio)
-        return (self.sequence_length - self.n_value) * 2
+        # Scoring happens for trials from n_value up to sequence_length - 1, one point per channel each
+        return (self.sequence_length - self.n_value) * self.num_channels
+
+
+@trace_methods("record_response_and_score", category="core")
+class NBackGame(MultiNBackGame):
+    """Dual N-back: a two-channel MultiNBackGame with visual (grid position) and audio stimuli."""
+
+    __slots__ = ()
+
+    def __init__(self, n_value=2, sequence_length=20, num_positions=9, num_audio_stimuli=9, seed=None):
+        # num_positions: visual stimuli (e.g., 3x3 grid); num_audio_stimuli: e.g. digits 1-9 or letters
+        super().__init__(n_value, sequence_length, (num_positions, num_audio_stimuli), seed)
+
+    @property
+    def num_positions(self):
+        return self.num_options[0]
+
+    @property
+    def num_audio_stimuli(self):
+        return self.num_options[1]
+
+    @property
+    def visual_sequence(self):
+        return self.stimuli[:, 0]
+
+    @property
+    def audio_sequence(self):
+        return self.stimuli[:, 1]
+
+    def record_response_and_score(self, visual_match_pressed, audio_match_pressed):
+        """Records the user's response for the *previous* stimulus presentation and scores it."""
+        # This is called *before* presenting the next stimulus, or at the end of a response window.
+        self.record_responses((visual_match_pressed, audio_match_pressed))
+
+    def _response_history(self, channel):
+        recorded = np.unpackbits(self._responses[-1], count=self.current_trial_index, bitorder='little').astype(bool)
+        return self.response_masks()[channel][recorded].tolist()
+
+    @property
+    def user_visual_responses_history(self):
+        """User's visual match button presses, one bool per record_response_and_score() call."""
+        return self._response_history(0)
+
+    @property
+    def user_audio_responses_history(self):
+        """User's audio match button presses, one bool per record_response_and_score() call."""
+        return self._response_history(1)
 
 
 # Example Usage (for testing the logic):
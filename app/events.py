@@ -0,0 +1,79 @@
+import time
+from array import array
+
+import numpy as np
+
+STIMULUS_ONSET = 0
+STIMULUS_OFFSET = 1
+BUTTON_PRESS = 2
+AUDIO_ONSET = 3
+
+NO_CHANNEL = 255  # Channel value for stimulus events, which cover all channels
+
+
+class TrialEventBuffer:
+    """Fixed-capacity ring buffer of timestamped trial events.
+
+    Storage is preallocated, so record() only writes into existing slots and never grows anything on
+    the input path. When more than capacity events are recorded, the oldest ones are overwritten.
+    """
+
+    __slots__ = ("capacity", "clock", "times", "kinds", "trials", "channels", "count")
+
+    def __init__(self, capacity=4096, clock=time.perf_counter):
+        self.capacity = capacity
+        self.clock = clock
+        self.times = array('d', bytes(8 * capacity))
+        self.kinds = array('B', bytes(capacity))
+        self.trials = array('I', [0]) * capacity
+        self.channels = array('B', bytes(capacity))
+        self.count = 0  # Total events recorded since the last reset
+
+    def reset(self):
+        self.count = 0
+
+    def record(self, kind, trial, channel=NO_CHANNEL, timestamp=None):
+        """Stores one event; timestamp defaults to the monotonic clock."""
+        slot = self.count % self.capacity
+        self.times[slot] = self.clock() if timestamp is None else timestamp
+        self.kinds[slot] = kind
+        self.trials[slot] = trial
+        self.channels[slot] = channel
+        self.count += 1
+
+    def snapshot(self):
+        """Returns (times, kinds, trials, channels) as NumPy arrays in chronological order."""
+        size = min(self.count, self.capacity)
+        start = self.count % self.capacity if self.count > self.capacity else 0
+        order = (np.arange(size) + start) % self.capacity
+        return (np.frombuffer(self.times, dtype=np.float64)[order],
+                np.frombuffer(self.kinds, dtype=np.uint8)[order],
+                np.frombuffer(self.trials, dtype=np.uintc)[order].astype(np.intp),
+                np.frombuffer(self.channels, dtype=np.uint8)[order])
+
+
+def reaction_times(events, num_trials, num_channels=2, first_trial=0):
+    """Turns a TrialEventBuffer into per-trial reaction times.
+
+    Returns (first_press, press_counts), both shaped (num_trials, num_channels), for trials first_trial
+    onwards. first_press holds the seconds from stimulus onset to the first press of the trial's response
+    window (NaN when there was no press or the onset was overwritten); press_counts counts every press,
+    including repeated ones.
+    """
+    times, kinds, trials, channels = events.snapshot()
+    trials = trials - first_trial
+    in_range = trials >= 0
+    times, kinds, trials, channels = times[in_range], kinds[in_range], trials[in_range], channels[in_range]
+    onsets = np.full(num_trials, np.nan)
+    is_onset = (kinds == STIMULUS_ONSET) & (trials < num_trials)
+    onsets[trials[is_onset]] = times[is_onset]
+
+    is_press = (kinds == BUTTON_PRESS) & (trials < num_trials) & (channels < num_channels)
+    press_trials, press_channels = trials[is_press], channels[is_press].astype(np.intp)
+    press_counts = np.zeros((num_trials, num_channels), dtype=np.int32)
+    np.add.at(press_counts, (press_trials, press_channels), 1)
+
+    first_press = np.full((num_trials, num_channels), np.inf)
+    np.minimum.at(first_press, (press_trials, press_channels), times[is_press] - onsets[press_trials])
+    first_press[np.isinf(first_press)] = np.nan
+    return first_press, press_counts
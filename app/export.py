@@ -0,0 +1,234 @@
+"""Columnar bulk export of the session log for analytics.
+
+Sessions are exported in fixed-size batches, each written as one chunk of two tables:
+
+    sessions  one row per session: session, timestamp, n_value, num_channels, num_trials, score, max_score,
+              first_row (row of the session's first trial in the trials table)
+    trials    one row per trial and channel: session, trial, channel, stimulus, pressed, match, outcome
+              (HIT / MISS / CORRECT_REJECTION / FALSE_ALARM, NOT_SCORED for the first n trials), correct,
+              reaction_time (seconds, NaN without a press or when it was not logged)
+
+Chunks are NumPy .npz files, or Parquet when pyarrow is installed, listed in a manifest.json next to them.
+Each batch is decoded from the memory-mapped log with a few vectorized operations per record shape, so
+export memory is bounded by the batch size. Exporting again into the same directory only appends the
+sessions logged since.
+
+    python -m app.export sessions.log export_dir [--batch-size 4096] [--format npz|parquet]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from app.core import stimulus_matrix
+from app.replay import NO_RT
+from app.scoring import outcome_codes
+from app.session_log import (FLAG_PRESS_TIMES, FLAG_SEEDED, HEADER_DTYPE, RECORD_HEADER, SessionLogReader,
+                             section_sizes)
+
+SESSION_COLUMNS = {"session": "<i8", "timestamp": "<f8", "n_value": "u1", "num_channels": "u1",
+                   "num_trials": "<u2", "score": "<u2", "max_score": "<u2", "first_row": "<i8"}
+TRIAL_COLUMNS = {"session": "<i8", "trial": "<u2", "channel": "u1", "stimulus": "u1", "pressed": "?",
+                 "match": "?", "outcome": "u1", "correct": "?", "reaction_time": "<f4"}
+TABLES = {"sessions": SESSION_COLUMNS, "trials": TRIAL_COLUMNS}
+NOT_SCORED = 255  # Outcome of the first n_value trials of a session, which have nothing to compare with
+
+MANIFEST = "manifest.json"
+FORMATS = ("npz", "parquet")
+
+
+def _parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def session_columns(reader, start, stop):
+    """Decodes sessions [start, stop) of a SessionLogReader into (sessions, trials) dicts of column arrays.
+
+    Records are grouped by shape (n_value, channels, trials, flags); each group is gathered from the map
+    and decoded at once, then scattered into the trial rows of its sessions, which stay in log order.
+    Seeded records regenerate their stimuli in one pass per distinct set of stimulus options.
+    """
+    indices = np.arange(start, stop)
+    headers = reader.record_bytes(indices, 0, HEADER_DTYPE.itemsize).view(HEADER_DTYPE).ravel()
+    rows_per_session = headers["num_trials"].astype(np.int64) * headers["num_channels"]
+    first_row = np.zeros(len(indices), dtype=np.int64)
+    np.cumsum(rows_per_session[:-1], out=first_row[1:])
+
+    sessions = {"session": indices, "first_row": first_row}
+    for name in ("timestamp", "n_value", "num_channels", "num_trials", "score", "max_score"):
+        sessions[name] = headers[name]
+    sessions = {name: np.ascontiguousarray(sessions[name], dtype=dtype) for name, dtype in SESSION_COLUMNS.items()}
+
+    trials = {name: np.empty(int(rows_per_session.sum()), dtype=dtype) for name, dtype in TRIAL_COLUMNS.items()}
+    shapes = np.stack([headers["n_value"], headers["num_channels"], headers["num_trials"],
+                       headers["flags"] & (FLAG_SEEDED | FLAG_PRESS_TIMES)], axis=1).astype(np.int64)
+    groups, group_of = np.unique(shapes, axis=0, return_inverse=True)
+    for group, (n_value, num_channels, num_trials, flags) in enumerate(groups.tolist()):
+        members = np.flatnonzero(group_of.ravel() == group)
+        records = indices[members]
+        size = num_trials * num_channels
+        stimuli_size, packed_size, _ = section_sizes(num_trials, num_channels, flags)
+        offset = RECORD_HEADER.size
+        if flags & FLAG_SEEDED:
+            seeds = reader.record_bytes(records, offset, 4).view("<u4").ravel().astype(np.uint64)
+            options = reader.record_bytes(records, offset + 4, stimuli_size - 4).view("<u2")
+            stimuli = np.empty((len(records), num_trials, num_channels), dtype=np.uint8)
+            distinct, options_of = np.unique(options, axis=0, return_inverse=True)
+            for index, num_options in enumerate(distinct.tolist()):
+                selected = options_of.ravel() == index
+                stimuli[selected] = stimulus_matrix(seeds[selected], num_trials, num_options)
+        else:
+            stimuli = reader.record_bytes(records, offset, size).reshape(-1, num_trials, num_channels)
+        offset += stimuli_size
+        packed = reader.record_bytes(records, offset, packed_size)
+        pressed = np.unpackbits(packed.reshape(len(records), num_channels, -1), axis=2, count=num_trials,
+                                bitorder='little').astype(bool).transpose(0, 2, 1)
+        offset += packed_size
+
+        match = np.zeros(pressed.shape, dtype=bool)
+        match[:, n_value:] = stimuli[:, n_value:] == stimuli[:, :-n_value]
+        outcome = np.full(pressed.shape, NOT_SCORED, dtype=np.uint8)
+        outcome[:, n_value:] = outcome_codes(match[:, n_value:], pressed[:, n_value:])
+        if flags & FLAG_PRESS_TIMES:
+            # One time per press, channel-major: the k-th press of a record is at offset + 2k
+            by_channel = pressed.transpose(0, 2, 1).reshape(len(records), -1)
+            record_of, cell = np.nonzero(by_channel)
+            rank = np.cumsum(by_channel, axis=1)[record_of, cell] - 1
+            rts = reader.record_bytes(records[record_of], offset + 2 * rank, 2).view("<u2").ravel()
+            times = np.full(by_channel.shape, np.nan)
+            times[record_of, cell] = np.where(rts == NO_RT, np.nan, rts / 1000)
+            reaction_time = times.reshape(len(records), num_channels, num_trials).transpose(0, 2, 1)
+        else:
+            reaction_time = np.full(stimuli.shape, np.nan)
+
+        rows = (first_row[members, None] + np.arange(size)).ravel()
+        trials["session"][rows] = np.repeat(records, size)
+        trials["trial"][rows] = np.tile(np.repeat(np.arange(num_trials), num_channels), len(members))
+        trials["channel"][rows] = np.tile(np.arange(num_channels), len(members) * num_trials)
+        trials["stimulus"][rows] = stimuli.ravel()
+        trials["pressed"][rows] = pressed.ravel()
+        trials["match"][rows] = match.ravel()
+        trials["outcome"][rows] = outcome.ravel()
+        trials["correct"][rows] = (outcome.ravel() != NOT_SCORED) & (outcome.ravel() % 2 == 0)  # Even codes
+        trials["reaction_time"][rows] = reaction_time.ravel()
+    return sessions, trials
+
+
+def _chunk_path(directory, table, chunk, file_format):
+    return os.path.join(directory, f"{table}-{chunk:05d}.{file_format}")
+
+
+def _write_table(path, columns, file_format):
+    if file_format == "parquet":
+        pyarrow = _parquet()
+        pyarrow.parquet.write_table(pyarrow.table(columns), path)
+    else:
+        with open(path, "wb") as f:
+            np.savez(f, **columns)
+
+
+def read_manifest(directory):
+    """Returns the manifest of an export directory, or None if nothing was exported there yet."""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)  # Chunks are listed only once fully written
+
+
+def export_sessions(log_path, directory, batch_size=4096, file_format=None):
+    """Exports the sessions of a log not yet in directory, batch_size sessions per chunk; returns the manifest.
+
+    file_format defaults to "parquet" when pyarrow is installed and "npz" otherwise; a directory keeps the
+    format it was first exported in.
+    """
+    manifest = read_manifest(directory)
+    new_export = manifest is None
+    if new_export:
+        if file_format is None:
+            file_format = "parquet" if _parquet() else "npz"
+        manifest = {"format": file_format, "sessions": 0, "rows": 0, "chunks": []}
+    elif file_format not in (None, manifest["format"]):
+        raise ValueError(f"{directory} holds a {manifest['format']} export.")
+    file_format = manifest["format"]
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r}.")
+    if file_format == "parquet" and not _parquet():
+        raise ValueError("Exporting to Parquet requires pyarrow.")
+    os.makedirs(directory, exist_ok=True)
+    if new_export:
+        _write_manifest(directory, manifest)  # Even with no sessions yet, so the export can be loaded
+
+    with SessionLogReader(log_path) as reader:
+        for start in range(manifest["sessions"], len(reader), batch_size):
+            stop = min(start + batch_size, len(reader))
+            sessions, trials = session_columns(reader, start, stop)
+            sessions["first_row"] += manifest["rows"]  # Rows are numbered across the whole export
+            chunk = len(manifest["chunks"])
+            _write_table(_chunk_path(directory, "sessions", chunk, file_format), sessions, file_format)
+            _write_table(_chunk_path(directory, "trials", chunk, file_format), trials, file_format)
+            num_rows = len(trials["session"])
+            manifest["chunks"].append({"sessions": stop - start, "rows": num_rows})
+            manifest["sessions"] = stop
+            manifest["rows"] += num_rows
+            _write_manifest(directory, manifest)
+    return manifest
+
+
+def load_columns(directory, table="trials", columns=None):
+    """Returns whole columns of an exported table ("sessions" or "trials") as a dict of NumPy arrays.
+
+    Each column is allocated once at its final size and filled chunk by chunk, so loading needs no more
+    memory than the result plus one chunk.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No export in {directory}.")
+    dtypes = TABLES[table]
+    columns = list(dtypes) if columns is None else list(columns)
+    count_key = "sessions" if table == "sessions" else "rows"
+    total = sum(chunk[count_key] for chunk in manifest["chunks"])
+    result = {name: np.empty(total, dtype=dtypes[name]) for name in columns}
+    position = 0
+    for chunk, entry in enumerate(manifest["chunks"]):
+        path = _chunk_path(directory, table, chunk, manifest["format"])
+        end = position + entry[count_key]
+        if manifest["format"] == "parquet":
+            data = _parquet().parquet.read_table(path, columns=columns)
+            for name in columns:
+                result[name][position:end] = data.column(name).to_numpy()
+        else:
+            with np.load(path) as data:
+                for name in columns:
+                    result[name][position:end] = data[name]
+        position = end
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log_path")
+    parser.add_argument("directory")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--format", choices=FORMATS, dest="file_format")
+    args = parser.parse_args()
+    manifest = export_sessions(args.log_path, args.directory, args.batch_size, args.file_format)
+    print(f"{manifest['sessions']} sessions, {manifest['rows']} trial rows in {len(manifest['chunks'])} "
+          f"{manifest['format']} chunks")
+
+
+if __name__ == "__main__":
+    main()
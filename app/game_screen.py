@@ -0,0 +1,446 @@
+import time
+
+from kivy.app import App
+from kivy.uix.screenmanager import Screen
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.image import Image
+from kivy.uix.popup import Popup
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle, Line
+from kivy.core.window import Window
+from kivy.logger import Logger
+
+from app.assets import ICON_PATH, scaled_asset
+from app.audio import AudioStimulusEngine, KivyAudioBackend
+from app.prefetch import prepare_session
+from app.events import AUDIO_ONSET, BUTTON_PRESS, STIMULUS_OFFSET, STIMULUS_ONSET, TrialEventBuffer
+from app.scheduler import TrialScheduler
+from app.stats import StatsIndex
+from app.tracing import get_tracer, trace_methods
+
+ENDLESS_TIMING_TRIALS = 4096  # Onset jitter and audio issue latency are kept for the first trials of endless sessions
+
+
+@trace_methods("highlight_cell", "clear_highlight", category="ui")
+class NBackGrid(GridLayout):
+    CELL_COLOR = (0.2, 0.2, 0.2, 1)
+    HIGHLIGHT_COLOR = (0.1, 0.7, 0.1, 1)
+    BORDER_COLOR = (0.5, 0.5, 0.5, 1)
+
+    def __init__(self, grid_size=3, **kwargs):
+        super().__init__(**kwargs)
+        self.cols = grid_size
+        self.spacing = 5
+        self.padding = 5  # Padding around the grid itself
+        self.cells = []
+        self.highlighted_index = None
+        # Canvas instructions are built once per cell and only mutated afterwards: highlighting touches
+        # the colour of at most two cells, and layout changes move the existing rectangle and border.
+        for i in range(grid_size * grid_size):
+            cell_label = Label(text="")
+            with cell_label.canvas.before:
+                cell_label._bg_color = Color(*self.CELL_COLOR)
+                cell_label._bg_rect = Rectangle(size=cell_label.size, pos=cell_label.pos)
+                Color(*self.BORDER_COLOR)
+                cell_label._border = Line(rectangle=(cell_label.x + 1, cell_label.y + 1,
+                                                     cell_label.width - 2, cell_label.height - 2),
+                                          width=1.2)  # Adjusted for spacing
+            cell_label.bind(size=self._update_cell_graphics, pos=self._update_cell_graphics)
+            self.cells.append(cell_label)
+            self.add_widget(cell_label)
+
+    def _update_cell_graphics(self, instance, value):
+        instance._bg_rect.pos = instance.pos
+        instance._bg_rect.size = instance.size
+        instance._border.rectangle = (instance.x + 1, instance.y + 1, instance.width - 2, instance.height - 2)
+
+    def highlight_cell(self, index):
+        if index == self.highlighted_index:
+            return
+        self.clear_highlight()
+        self.cells[index]._bg_color.rgba = self.HIGHLIGHT_COLOR
+        self.highlighted_index = index
+
+    def clear_highlight(self):
+        if self.highlighted_index is not None:
+            self.cells[self.highlighted_index]._bg_color.rgba = self.CELL_COLOR
+            self.highlighted_index = None
+
+
+class PooledPopup(Popup):
+    """Popup built once and opened many times.
+
+    ModalView.open() binds center and size to _align_center on every open and never unbinds them, so a
+    reused popup would gain two bindings per open; they are dropped again on dismiss.
+    """
+
+    def on_dismiss(self):
+        self.funbind('center', self._align_center)
+        self.funbind('size', self._align_center)
+
+
+@trace_methods("start_game_sequence", "present_stimulus", "clear_stimulus", "on_visual_match", "on_audio_match",
+               "end_game", "save_session", "go_to_main_menu", "show_info_popup_on_press", category="ui")
+class GameScreen(Screen):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.game = None
+        self.game_in_progress = False
+        self.stimulus_duration = 1.5
+        self.inter_stimulus_interval = 0.5
+        self.user_responded_visual = False
+        self.user_responded_audio = False
+        self.current_n_value = 2
+        self.endless = False
+        self.stimulus_onset_time = None
+        self.info_popup_instance = None
+        self.info_label = None
+        self.score_popup = None
+        self.score_popup_label = None
+        self.sound_bank = None
+        self.pending_session = None  # Future of a PreparedSession still being prepared by the prefetcher
+        self.trial_events = TrialEventBuffer(clock=time.perf_counter)
+        self.last_reaction_times = None
+        self.last_onset_jitter = None  # TrialScheduler.jitter_stats() of the last finished session
+        self.last_audio_latency = None  # AudioStimulusEngine.issue_latency_stats() of the last finished session
+        app = App.get_running_app()
+        # With an app running, the prefetch worker writes and loads the sounds into this backend, off the UI thread
+        backend = app.get_session_prefetcher().audio_backend if app is not None else KivyAudioBackend()
+        self.audio_engine = AudioStimulusEngine(backend, clock=time.perf_counter)
+        self.scheduler = TrialScheduler(Clock.schedule_once, self.present_stimulus, self.clear_stimulus,
+                                        stimulus_duration=self.stimulus_duration,
+                                        inter_stimulus_interval=self.inter_stimulus_interval, lead_in=1)
+
+        self.layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
+
+        top_bar = BoxLayout(size_hint_y=None, height=64, spacing=10)
+        try:
+            self.game_icon = Image(source=scaled_asset(ICON_PATH, 64), size_hint_x=None, width=64, height=64)
+        except Exception as e:
+            print(f"Error loading game icon: {e}")
+            self.game_icon = Label(text="Icon", size_hint_x=None, width=64)
+        self.n_value_label = Label(text=f"N = {self.current_n_value}", size_hint_x=0.2, font_size='18sp')
+        self.score_label = Label(text="Score: 0", size_hint_x=0.5, font_size='18sp')
+
+        self.info_button = Button(text="?", size_hint_x=None, width=64, font_size='24sp')
+        self.info_button.bind(on_press=self.show_info_popup_on_press)
+        self.info_button.bind(on_release=self.dismiss_info_popup_on_release)
+
+        top_bar.add_widget(self.game_icon)
+        top_bar.add_widget(self.n_value_label)
+        top_bar.add_widget(self.score_label)
+        top_bar.add_widget(self.info_button)
+        self.layout.add_widget(top_bar)
+
+        stimuli_layout = BoxLayout(orientation='horizontal', spacing=10, size_hint_y=0.6)
+        self.visual_grid = NBackGrid(size_hint_x=0.7)
+        stimuli_layout.add_widget(self.visual_grid)
+        self.audio_label = Label(text="Audio: -", font_size='40sp', size_hint_x=0.3)
+        stimuli_layout.add_widget(self.audio_label)
+        self.layout.add_widget(stimuli_layout)
+
+        controls_layout = GridLayout(cols=2, size_hint_y=None, height=100, spacing=10)
+        self.visual_match_button = Button(text="Visual Match", on_press=self.on_visual_match, disabled=True,
+                                          font_size='18sp')
+        self.audio_match_button = Button(text="Audio Match", on_press=self.on_audio_match, disabled=True,
+                                         font_size='18sp')
+        controls_layout.add_widget(self.visual_match_button)
+        controls_layout.add_widget(self.audio_match_button)
+        self.layout.add_widget(controls_layout)
+
+        self.back_to_menu_button = Button(text="Back to Menu", on_press=self.on_back_button, size_hint_y=None,
+                                          height=50, font_size='18sp')
+        self.layout.add_widget(self.back_to_menu_button)
+
+        self.feedback_label = Label(text="Select N and Start from Main Menu", size_hint_y=None, height=30,
+                                    font_size='16sp')
+        self.layout.add_widget(self.feedback_label)
+        self.add_widget(self.layout)
+
+    def set_n_value(self, n_val, endless=False):
+        self.current_n_value = n_val
+        self.endless = endless
+        self.n_value_label.text = f"N = {self.current_n_value}"
+        self.game = None
+        self.pending_session = None
+        app = App.get_running_app()
+        if app is None:  # Driven headless, e.g. by the benchmarks: there is no UI to keep responsive
+            self._use_session(prepare_session(n_val, endless, bank=self.audio_engine.bank or None))
+            return
+        # Sessions prefetched while the menu was showing are taken over as is; others are prepared on the
+        # prefetch worker too, so decoding the sound bank never blocks the UI thread
+        future = app.get_session_prefetcher().take((n_val, endless))
+        if future.done() and future.exception() is None:
+            self._use_session(future.result())
+        else:
+            self.pending_session = future  # on_enter waits for it, or reports why preparing it failed
+
+    def _use_session(self, prepared):
+        self.game = prepared.game
+        self.sound_bank = prepared.bank
+        self.pending_session = None
+
+    def _on_session_ready(self, future):
+        # Called on the prefetch worker thread: continue on the main thread
+        Clock.schedule_once(lambda dt: self._start_pending_session(future))
+
+    def _start_pending_session(self, future):
+        if future is self.pending_session:
+            try:
+                prepared = future.result()
+            except Exception as e:
+                self.pending_session = None
+                self.feedback_label.text = f"Error preparing session: {e}"
+                return
+            self._use_session(prepared)
+            if self.manager and self.manager.current == self.name:
+                self.start_game_sequence()
+
+    def on_enter(self, *args):
+        if self.game:
+            self.start_game_sequence()
+        elif self.pending_session is not None:
+            self.feedback_label.text = "Preparing session..."
+            self.pending_session.add_done_callback(self._on_session_ready)
+        else:
+            self.feedback_label.text = "Error: Game not initialized. Go to Menu."
+
+    def start_game_sequence(self, *args):
+        if not self.game_in_progress and self.game:
+            if self.game.get_current_trial_number():
+                self.game.generate_sequences()  # Replaying a session that was already (partly) played
+            self.trial_events.reset()
+            # One onset per trial plus the final one that scores the last response and ends the game
+            num_onsets = ENDLESS_TIMING_TRIALS if self.endless else self.game.sequence_length + 1
+            self.audio_engine.prepare(self.game.num_audio_stimuli, num_onsets, bank=self.sound_bank)
+            self.game_in_progress = True
+            # Endless sessions only end when the player stops them
+            self.back_to_menu_button.text = "End Session" if self.endless else "Back to Menu"
+            self.back_to_menu_button.disabled = not self.endless
+            self.score_label.text = "Score: 0"
+            self.feedback_label.text = "Game Started! Get Ready..."
+            self.visual_match_button.disabled = True
+            self.audio_match_button.disabled = True
+            self.scheduler.start(num_onsets)
+
+    def present_stimulus(self, dt):
+        if not self.game_in_progress: return
+        if self.game.get_current_trial_number() > self.game.n_value:
+            self.game.record_response_and_score(self.user_responded_visual, self.user_responded_audio)
+            if self.endless:
+                self.score_label.text = (f"Score: {self.game.get_score()} "
+                                         f"({self.game.rolling_accuracy():.0%} recent)")
+            else:
+                self.score_label.text = f"Score: {self.game.get_score()}"
+            tracer = get_tracer()
+            if tracer is not None:
+                tracer.counter("score", self.game.get_score())
+
+        if self.game.is_game_over():
+            self.end_game()
+            return
+
+        self.user_responded_visual = False
+        self.user_responded_audio = False
+        self.visual_match_button.background_color = [1, 1, 1, 1]
+        self.audio_match_button.background_color = [1, 1, 1, 1]
+
+        visual_stim, audio_stim = self.game.next_stimuli()
+
+        if visual_stim is not None:
+            self.visual_grid.highlight_cell(visual_stim)
+            self.audio_label.text = f"Audio: {audio_stim + 1}"
+            trial = self.game.current_trial_index - 1
+            visual_onset = time.perf_counter()
+            self.stimulus_onset_time = visual_onset
+            self.trial_events.record(STIMULUS_ONSET, trial, timestamp=visual_onset)
+            self.trial_events.record(AUDIO_ONSET, trial, timestamp=self.audio_engine.play(audio_stim, visual_onset))
+            if self.endless:
+                self.feedback_label.text = f"Stimulus: {self.game.current_trial_index}"
+            else:
+                self.feedback_label.text = f"Stimulus: {self.game.current_trial_index} / {self.game.sequence_length}"
+
+            if self.game.get_current_trial_number() > self.game.n_value:
+                self.visual_match_button.disabled = False
+                self.audio_match_button.disabled = False
+            else:
+                self.visual_match_button.disabled = True
+                self.audio_match_button.disabled = True
+        else:
+            self.end_game()
+
+    def clear_stimulus(self, dt):
+        if not self.game_in_progress: return
+        self.visual_grid.clear_highlight()
+        self.audio_label.text = "Audio: -"
+        self.trial_events.record(STIMULUS_OFFSET, self.game.current_trial_index - 1)
+        if self.game.get_current_trial_number() > self.game.n_value:
+            self.feedback_label.text = "Respond now!"
+        else:
+            self.feedback_label.text = "Observe..."
+
+    def _press_timestamp(self, instance):
+        """Monotonic time of the touch that triggered a button, falling back to the callback time."""
+        now = time.perf_counter()
+        touch = getattr(instance, 'last_touch', None)
+        if touch is not None:
+            # Touches are stamped with wall-clock time on arrival; shift that age onto the monotonic clock
+            age = time.time() - touch.time_start
+            if 0 <= age < 0.25:
+                now -= age
+        return now
+
+    def _record_press(self, instance, channel, first_press):
+        timestamp = self._press_timestamp(instance)
+        self.trial_events.record(BUTTON_PRESS, self.game.current_trial_index - 1, channel, timestamp)
+        if self.endless and first_press and self.stimulus_onset_time is not None:
+            # Endless sessions outlive the event buffer, so their reaction times are also folded in as they come
+            self.game.add_reaction_time(timestamp - self.stimulus_onset_time)
+
+    def on_visual_match(self, instance):
+        if not self.visual_match_button.disabled:
+            self._record_press(instance, 0, not self.user_responded_visual)
+            self.user_responded_visual = True
+            self.visual_match_button.background_color = [0.5, 1, 0.5, 1]
+
+    def on_audio_match(self, instance):
+        if not self.audio_match_button.disabled:
+            self._record_press(instance, 1, not self.user_responded_audio)
+            self.user_responded_audio = True
+            self.audio_match_button.background_color = [0.5, 1, 0.5, 1]
+
+    def end_game(self):
+        self.game_in_progress = False
+        self.scheduler.cancel()
+        if self.game:
+            self.last_reaction_times = self.game.reaction_times(self.trial_events)
+        jitter = self.last_onset_jitter = self.scheduler.jitter_stats()
+        if jitter:
+            Logger.debug(f"GameScreen: Onset timing over {jitter['trials']} trials: "
+                         f"mean {jitter['mean'] * 1000:.1f} ms, p95 {jitter['p95'] * 1000:.1f} ms, "
+                         f"max {jitter['max'] * 1000:.1f} ms")
+        latency = self.last_audio_latency = self.audio_engine.issue_latency_stats()
+        if latency:
+            Logger.debug(f"GameScreen: Audio issued after visual onset: mean {latency['mean'] * 1000:.2f} ms, "
+                         f"p95 {latency['p95'] * 1000:.2f} ms, max {latency['max'] * 1000:.2f} ms")
+        self.back_to_menu_button.text = "Back to Menu"
+        self.back_to_menu_button.disabled = False
+        self.visual_match_button.disabled = True
+        self.audio_match_button.disabled = True
+        self.visual_grid.clear_highlight()
+        self.audio_label.text = "Audio: -"
+
+        final_score = self.game.get_score() if self.game else 0
+        max_score = self.game.get_max_possible_score() if self.game else 0
+        score_text = f"Game Over!\nFinal Score: {final_score} / {max_score}"
+        if self.endless:
+            count, mean_rt, _ = self.game.reaction_time_stats()
+            if count:
+                score_text += f"\nMean reaction time: {mean_rt * 1000:.0f} ms"
+        else:
+            best = self.save_session()
+            if best:
+                score_text += f"\nBest at N = {self.current_n_value}: {best[1]}"
+
+        score_popup = self._get_score_popup()
+        self.score_popup_label.text = score_text
+        score_popup.height = Window.height * 0.4
+        score_popup.open()
+        app = App.get_running_app()
+        if app:
+            app.prefetch_sessions(self.current_n_value, self.endless)  # While the score is being read
+
+    def _get_score_popup(self):
+        """Returns the score popup, building it on the first game over; later games only update its text."""
+        if self.score_popup is None:
+            popup_content = BoxLayout(orientation='vertical', padding=20, spacing=10)
+            self.score_popup_label = Label(font_size='24sp', halign='center')
+            popup_content.add_widget(self.score_popup_label)
+            close_button = Button(text="OK", size_hint_y=None, height=50, font_size='18sp')
+            popup_content.add_widget(close_button)
+
+            self.score_popup = PooledPopup(title="Game Finished", content=popup_content,
+                                           size_hint=(0.6, None), height=Window.height * 0.4, auto_dismiss=False)
+            close_button.bind(on_press=self.dismiss_score_popup)
+        return self.score_popup
+
+    def save_session(self):
+        app = App.get_running_app()
+        if not self.game or not app:
+            return
+        if app.stats_index is None:
+            app.stats_index = StatsIndex()
+        app.stats_index.record_game(self.game)
+        if app.session_log:
+            try:
+                first_press = self.last_reaction_times[0] if self.last_reaction_times is not None else None
+                app.session_log.append_game(self.game, first_press=first_press)
+            except OSError as e:
+                print(f"Error saving session: {e}")
+        return app.stats_index.best_for_n(self.game.n_value)
+
+    def dismiss_score_popup(self, instance):
+        self.score_popup.dismiss()
+        self.go_to_main_menu(None)
+
+    def on_back_button(self, instance):
+        if self.game_in_progress and self.endless:
+            self.end_game()
+        else:
+            self.go_to_main_menu(instance)
+
+    def go_to_main_menu(self, instance):
+        self.game_in_progress = False
+        self.scheduler.cancel()
+        if self.score_popup is not None and self.score_popup._is_open:
+            self.score_popup.dismiss()
+        if self.info_popup_instance is not None and self.info_popup_instance._is_open:
+            self.info_popup_instance.dismiss()
+        self.manager.current = 'main_menu'
+
+    def show_info_popup_on_press(self, instance):
+        info_popup = self._get_info_popup()
+        if info_popup._is_open:
+            return
+        self.info_label.text = (f"Dual N-Back Game v2.0\n\n"
+                                f"Instructions:\n"
+                                f"- Visual: Click 'Visual Match' if the square's position is the same as N trials ago.\n"
+                                f"- Audio: Click 'Audio Match' if the displayed number is the same as N trials ago.\n"
+                                f"- N is currently set to: {self.current_n_value}\n\n"
+                                f"Developer: Shangsi Rick Ren (renshangsi@gmail.com) plus Manus")
+        info_popup.size = (Window.width * 0.8, Window.height * 0.6)
+        info_popup.open()
+
+    def _get_info_popup(self):
+        """Returns the info popup, built with its canvas instructions and bindings on the first press only."""
+        if self.info_popup_instance is None:
+            popup_main_content = BoxLayout(orientation='vertical', padding=10, spacing=5)
+            info_label = Label(halign='left', valign='top', color=(1, 1, 1, 1), font_size='14sp')
+            info_label.bind(size=lambda *x: setattr(info_label, 'text_size', (info_label.width, None)))
+            popup_main_content.add_widget(info_label)
+            self.info_label = info_label
+
+            wrapper = BoxLayout(opacity=0.9)
+            with wrapper.canvas.before:
+                Color(0.15, 0.15, 0.15, 0.9)
+                self.info_popup_bg_rect = Rectangle(size=wrapper.size, pos=wrapper.pos)
+            wrapper.bind(size=self._update_info_popup_bg, pos=self._update_info_popup_bg)
+            wrapper.add_widget(popup_main_content)
+
+            self.info_popup_instance = PooledPopup(title='Game Info & Credits', content=wrapper,
+                                                   size_hint=(None, None),
+                                                   size=(Window.width * 0.8, Window.height * 0.6),
+                                                   auto_dismiss=False, title_color=(1, 1, 1, 1),
+                                                   separator_color=(0.3, 0.3, 0.3, 1))
+        return self.info_popup_instance
+
+    def _update_info_popup_bg(self, instance, value):
+        self.info_popup_bg_rect.pos = instance.pos
+        self.info_popup_bg_rect.size = instance.size
+
+    def dismiss_info_popup_on_release(self, instance):
+        if self.info_popup_instance is not None:
+            self.info_popup_instance.dismiss()
@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.audio import SAMPLE_RATE, load_sound_bank
+from app.core import NBackGame
+from app.streaming import StreamingNBackGame
+
+
+class PreparedSession:
+    """A session ready to play: its game with sequences generated and the decoded sound bank."""
+
+    __slots__ = ("game", "bank")
+
+    def __init__(self, game, bank):
+        self.game = game
+        self.bank = bank
+
+
+def prepare_session(n_value, endless=False, sequence_length=20, num_positions=9, num_audio_stimuli=9,
+                    bank=None, sample_rate=SAMPLE_RATE):
+    """Builds the game for a session and generates its sequences; decodes the sound bank unless given."""
+    if endless:
+        game = StreamingNBackGame(n_value=n_value, num_positions=num_positions,
+                                  num_audio_stimuli=num_audio_stimuli)
+    else:
+        game = NBackGame(n_value=n_value, sequence_length=sequence_length, num_positions=num_positions,
+                         num_audio_stimuli=num_audio_stimuli)
+        game.generate_sequences()
+    if bank is None:
+        bank = load_sound_bank(num_audio_stimuli, sample_rate)
+    return PreparedSession(game, bank)
+
+
+class SessionPrefetcher:
+    """Prepares upcoming sessions on a worker thread so that starting a game does no work on the UI thread.
+
+    prefetch() is given the keys of the sessions likely to be played next, (n_value, endless) pairs, and
+    prepares each one once in the background; keys that are no longer likely are dropped. take() hands a
+    session over as a Future, removing it from the prefetcher, so a prepared session is used at most once
+    and the worker never touches it afterwards; a session that was not prefetched is queued on the worker
+    too, so nothing is prepared on the main thread. The sound bank is decoded once and shared by all sessions.
+    Given an audio_backend, the worker also loads the bank into it before handing over the first session, so
+    AudioStimulusEngine.prepare() finds the sounds already loaded when the session starts.
+
+    Both methods are meant to be called from the main thread.
+    """
+
+    def __init__(self, sequence_length=20, num_positions=9, num_audio_stimuli=9, sample_rate=SAMPLE_RATE,
+                 audio_backend=None):
+        self.sequence_length = sequence_length
+        self.num_positions = num_positions
+        self.num_audio_stimuli = num_audio_stimuli
+        self.sample_rate = sample_rate
+        self.audio_backend = audio_backend
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-prefetch")
+        self._pending = {}  # key -> Future of a PreparedSession
+        self._bank = None  # Written by the worker only
+
+    def _prepare(self, key):
+        n_value, endless = key
+        if self._bank is None:
+            self._bank = load_sound_bank(self.num_audio_stimuli, self.sample_rate)
+        if self.audio_backend is not None:
+            self.audio_backend.load(self._bank, self.sample_rate)  # Returns at once when already loaded
+        return prepare_session(n_value, endless, self.sequence_length, self.num_positions, self.num_audio_stimuli,
+                               self._bank, self.sample_rate)
+
+    def prefetch(self, keys):
+        """Starts preparing every key in keys that is not prepared yet and drops the other keys."""
+        keys = list(keys)
+        for key in list(self._pending):
+            if key not in keys:
+                self._pending.pop(key).cancel()
+        for key in keys:
+            if key not in self._pending:
+                self._pending[key] = self._executor.submit(self._prepare, key)
+
+    def take(self, key):
+        """Hands over the session for key as a Future (possibly still running), preparing it if it was not
+        prefetched."""
+        future = self._pending.pop(key, None)
+        return future if future is not None else self._executor.submit(self._prepare, key)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._pending.clear()
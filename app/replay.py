@@ -0,0 +1,134 @@
+import struct
+
+import numpy as np
+
+from app.core import MultiNBackGame, NBackGame, stimulus_matrix
+from app.scoring import NUM_OUTCOMES, ScoreSummary, outcome_counts
+
+# Replay layout: | header | options (u16 per channel) | packed responses (channels x ceil(trials / 8)) |
+#                | u16 RT per pressed trial and channel |
+# The stimuli are not stored: they are regenerated from the seed.
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct("<BIBHB")  # version, seed, n_value, sequence_length, num_channels
+NO_RT = 0xFFFF  # Pressed, but no reaction time available
+MAX_RT_MS = 0xFFFE
+
+
+def encode_replay(game, first_press=None):
+    """Packs a played MultiNBackGame into seed + parameters + bit-packed responses + reaction times in ms.
+
+    first_press is the (trials, channels) array from game.reaction_times(); one u16 is stored per pressed
+    trial and channel, in channel-major order. Games whose stimuli were loaded rather than generated from
+    their seed cannot be replayed and raise ValueError.
+    """
+    if game.seed is None:
+        raise ValueError("The game's stimuli were not generated from its seed.")
+    if game.sequence_length - game.n_value > 0xFFFF:
+        raise ValueError("Replays hold at most 65535 trials.")
+    masks = np.zeros((game.num_channels, game.sequence_length), dtype=bool)
+    recorded = game.response_masks()
+    masks[:, :recorded.shape[1]] = recorded
+    rts = np.full(masks.shape, NO_RT, dtype="<u2")
+    if first_press is not None:
+        milliseconds = np.asarray(first_press, dtype=np.float64).T * 1000
+        known = ~np.isnan(milliseconds)
+        rts[known] = np.clip(np.rint(milliseconds[known]), 0, MAX_RT_MS)
+    header = REPLAY_HEADER.pack(REPLAY_VERSION, game.seed, game.n_value, game.sequence_length - game.n_value,
+                                game.num_channels)
+    return (header + np.array(game.num_options, dtype="<u2").tobytes()
+            + np.packbits(masks, axis=1, bitorder='little').tobytes() + rts[masks].tobytes())
+
+
+def _decode_header(data):
+    version, seed, n_value, sequence_length, num_channels = REPLAY_HEADER.unpack_from(data)
+    if version != REPLAY_VERSION:
+        raise ValueError(f"Unsupported replay version {version}.")
+    num_options = tuple(np.frombuffer(data, dtype="<u2", count=num_channels, offset=REPLAY_HEADER.size).tolist())
+    return seed, n_value, sequence_length, num_options
+
+
+class Replay:
+    """Decoded replay. Sequences, scores and game instances are rebuilt on demand."""
+
+    __slots__ = ("seed", "n_value", "sequence_length", "num_options", "responses", "reaction_times")
+
+    def __init__(self, data):
+        self.seed, self.n_value, self.sequence_length, self.num_options = _decode_header(data)
+        num_channels = len(self.num_options)
+        total = self.total_length
+        offset = REPLAY_HEADER.size + 2 * num_channels
+        packed_size = num_channels * ((total + 7) // 8)
+        packed = np.frombuffer(data, dtype=np.uint8, count=packed_size, offset=offset)
+        masks = np.unpackbits(packed.reshape(num_channels, -1), axis=1, count=total, bitorder='little').astype(bool)
+        rts = np.full(masks.shape, np.nan)
+        stored = np.frombuffer(data, dtype="<u2", count=int(masks.sum()), offset=offset + packed_size)
+        rts[masks] = np.where(stored == NO_RT, np.nan, stored / 1000)
+        self.responses = masks.T  # (trials, channels), aligned with the stimuli
+        self.reaction_times = rts.T  # Seconds, NaN where there was no press
+
+    @property
+    def total_length(self):
+        return self.sequence_length + self.n_value
+
+    @property
+    def num_positions(self):
+        return self.num_options[0]
+
+    @property
+    def num_audio_stimuli(self):
+        return self.num_options[1]
+
+    def sequences(self):
+        return stimulus_matrix(self.seed, self.total_length, self.num_options)
+
+    def score_summary(self):
+        return ScoreSummary(outcome_counts(self.sequences(), self.responses, self.n_value))
+
+    def game(self):
+        """Rebuilds the finished game, replaying every response through the live scoring path.
+
+        Dual replays give an NBackGame, others a MultiNBackGame.
+        """
+        if len(self.num_options) == 2:
+            game = NBackGame(self.n_value, self.sequence_length, *self.num_options, seed=self.seed)
+        else:
+            game = MultiNBackGame(self.n_value, self.sequence_length, self.num_options, self.seed)
+        game.generate_sequences()
+        while not game.is_game_over():
+            game.next_stimuli()
+            if game.get_current_trial_number() > game.n_value:
+                game.record_responses(self.responses[game.current_trial_index - 1])
+        return game
+
+
+def decode_replay(data):
+    return Replay(data)
+
+
+def rescore_replays(blobs):
+    """Re-scores many replays with the current scoring rules.
+
+    Returns outcome counts of shape (sessions, channels, NUM_OUTCOMES) in input order; wrap them in
+    ScoreSummary for scores, d' and criterion. All replays must have the same number of channels. Sessions
+    sharing n_value, length and stimulus options are scored in one vectorized pass.
+    """
+    groups = {}
+    for index, blob in enumerate(blobs):
+        seed, n_value, sequence_length, num_options = _decode_header(blob)
+        group = groups.setdefault((n_value, sequence_length + n_value, num_options), ([], [], []))
+        group[0].append(index)
+        group[1].append(seed)
+        group[2].append(blob)
+    if len({len(num_options) for _, _, num_options in groups}) > 1:
+        raise ValueError("Replays with different numbers of channels cannot be re-scored together.")
+    num_channels = len(next(iter(groups))[2]) if groups else 2
+    counts = np.zeros((len(blobs), num_channels, NUM_OUTCOMES), dtype=np.int64)
+    for (n_value, total, num_options), (indices, seeds, group_blobs) in groups.items():
+        start = REPLAY_HEADER.size + 2 * num_channels
+        packed_size = num_channels * ((total + 7) // 8)
+        packed = np.frombuffer(b"".join(blob[start:start + packed_size] for blob in group_blobs), dtype=np.uint8)
+        masks = np.unpackbits(packed.reshape(len(indices), num_channels, -1), axis=2, count=total,
+                              bitorder='little')
+        sequences = stimulus_matrix(np.array(seeds, dtype=np.uint64), total, num_options)
+        counts[indices] = outcome_counts(sequences, masks.transpose(0, 2, 1), n_value)
+    return counts
@@ -0,0 +1,124 @@
+import time
+from array import array
+
+import numpy as np
+
+MAX_LEAD = 1 / 30  # Never fire more than two frames early to compensate for callback latency
+
+
+def timing_summary(values, percentiles=(95,), count_key="trials", scale=1):
+    """Returns the mean, the given percentiles and the max of a timing array times scale, or None if it is empty.
+
+    Percentiles are keyed "p95" etc., and the number of values is stored under count_key.
+    """
+    if not len(values):
+        return None
+    values = np.asarray(values, dtype=np.float64) * scale
+    summary = {"mean": float(values.mean())}
+    summary.update((f"p{q}", float(value)) for q, value in zip(percentiles, np.percentile(values, percentiles)))
+    summary["max"] = float(values.max())
+    summary[count_key] = len(values)
+    return summary
+
+
+class TrialScheduler:
+    """Drives stimulus onsets and offsets from absolute deadlines on a monotonic clock.
+
+    Trial k starts at start + lead_in + k * (stimulus_duration + inter_stimulus_interval) and ends
+    stimulus_duration later, regardless of how late earlier callbacks fired, so scheduling latency never
+    accumulates. Each timer is requested slightly early by a running estimate of the event loop's lateness.
+    Actual vs. intended onsets of every trial are recorded for jitter statistics.
+
+    schedule_once(callback, delay) must return an event with a cancel() method, e.g. kivy.clock.Clock.
+    on_onset / on_offset are called with the dt argument of the timer, like Clock callbacks.
+    """
+
+    def __init__(self, schedule_once, on_onset, on_offset, stimulus_duration=1.5, inter_stimulus_interval=0.5,
+                 lead_in=1.0, clock=time.perf_counter):
+        self.schedule_once = schedule_once
+        self.on_onset = on_onset
+        self.on_offset = on_offset
+        self.stimulus_duration = stimulus_duration
+        self.inter_stimulus_interval = inter_stimulus_interval
+        self.lead_in = lead_in
+        self.clock = clock
+
+        self.running = False
+        self.trial_index = 0
+        self.session_start = None
+        self.intended_onsets = array('d')
+        self.actual_onsets = array('d')
+        self._num_recorded = 0
+        self._lead = 0.0
+        self._requested = 0.0
+        self._deadline = 0.0
+        self._event = None
+
+    def start(self, num_trials):
+        """Starts a session; onset timing is recorded for up to num_trials trials."""
+        self.cancel()
+        self.running = True
+        self.trial_index = 0
+        self.session_start = self.clock()
+        self.intended_onsets = array('d', bytes(8 * num_trials))  # Preallocated, nothing grows mid-session
+        self.actual_onsets = array('d', bytes(8 * num_trials))
+        self._num_recorded = 0
+        self._schedule(self._fire_onset, self.onset_deadline(0))
+
+    def cancel(self):
+        self.running = False
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+
+    def onset_deadline(self, trial_index):
+        period = self.stimulus_duration + self.inter_stimulus_interval
+        return self.session_start + self.lead_in + trial_index * period
+
+    def offset_deadline(self, trial_index):
+        return self.onset_deadline(trial_index) + self.stimulus_duration
+
+    def _schedule(self, callback, deadline):
+        self._requested = deadline - self._lead
+        self._deadline = deadline
+        self._event = self.schedule_once(callback, max(0.0, self._requested - self.clock()))
+
+    def _observe(self):
+        """Returns the current time and updates the lateness estimate from the timer that just fired."""
+        now = self.clock()
+        # Exponential moving average of how late the event loop fires relative to the requested time
+        self._lead = min(MAX_LEAD, max(0.0, 0.8 * self._lead + 0.2 * (now - self._requested)))
+        return now
+
+    def _fire_onset(self, dt):
+        self._event = None
+        if not self.running:
+            return
+        now = self._observe()
+        if self._num_recorded < len(self.actual_onsets):
+            self.intended_onsets[self._num_recorded] = self._deadline - self.session_start
+            self.actual_onsets[self._num_recorded] = now - self.session_start
+            self._num_recorded += 1
+        self.on_onset(dt)
+        if self.running:
+            self._schedule(self._fire_offset, self.offset_deadline(self.trial_index))
+
+    def _fire_offset(self, dt):
+        self._event = None
+        if not self.running:
+            return
+        self._observe()
+        self.on_offset(dt)
+        if self.running:
+            self.trial_index += 1
+            self._schedule(self._fire_onset, self.onset_deadline(self.trial_index))
+
+    def onset_errors(self):
+        """Returns actual minus intended onset time in seconds for every recorded trial."""
+        count = self._num_recorded
+        return (np.frombuffer(self.actual_onsets, dtype=np.float64)[:count]
+                - np.frombuffer(self.intended_onsets, dtype=np.float64)[:count])
+
+    def jitter_stats(self):
+        """Returns mean, p95 and max onset error in seconds, or None before the first onset."""
+        return timing_summary(self.onset_errors())
@@ -0,0 +1,102 @@
+import numpy as np
+
+# Outcome codes: 2 * (not a match) + (response differs from the truth). Even codes are correct.
+HIT = 0
+MISS = 1
+CORRECT_REJECTION = 2
+FALSE_ALARM = 3
+NUM_OUTCOMES = 4
+
+# Coefficients of Acklam's rational approximation of the inverse normal CDF (relative error < 1.2e-9)
+_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+      1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+      6.680131188771972e+01, -1.328068155288572e+01)
+_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+      -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+_P_LOW = 0.02425
+
+
+def outcome_codes(actual_match, pressed):
+    """Classifies responses as HIT / MISS / CORRECT_REJECTION / FALSE_ALARM.
+
+    Works on plain bools for the live per-trial path and on bool arrays for whole sessions.
+    """
+    return 2 * (1 - actual_match) + (pressed != actual_match)
+
+
+def norm_ppf(p):
+    """Vectorized inverse of the standard normal CDF for p in (0, 1)."""
+    p = np.asarray(p, dtype=np.float64)
+    q = np.minimum(p, 1.0 - p)
+    out = np.empty_like(p)
+
+    tail = q < _P_LOW
+    r = np.sqrt(-2.0 * np.log(q[tail]))
+    out[tail] = (((((_C[0] * r + _C[1]) * r + _C[2]) * r + _C[3]) * r + _C[4]) * r + _C[5]) / \
+                ((((_D[0] * r + _D[1]) * r + _D[2]) * r + _D[3]) * r + 1.0)
+
+    central = ~tail
+    u = q[central] - 0.5
+    r = u * u
+    out[central] = (((((_A[0] * r + _A[1]) * r + _A[2]) * r + _A[3]) * r + _A[4]) * r + _A[5]) * u / \
+                   (((((_B[0] * r + _B[1]) * r + _B[2]) * r + _B[3]) * r + _B[4]) * r + 1.0)
+
+    # The formulas above give the lower-tail quantile of q; mirror it for p > 0.5
+    return np.where(p > 0.5, -out, out)
+
+
+def outcome_counts(sequences, responses, n_value):
+    """Counts outcomes per session and channel.
+
+    sequences and responses share the shape (trials, channels) or (sessions, trials, channels) and are
+    aligned by trial index; responses for the first n_value trials are ignored. Returns an int array of
+    shape (..., channels, NUM_OUTCOMES) indexed by the outcome codes.
+    """
+    sequences = np.asarray(sequences)
+    responses = np.asarray(responses, dtype=bool)
+    if sequences.shape != responses.shape:
+        raise ValueError(f"sequences {sequences.shape} and responses {responses.shape} must have the same shape.")
+    actual_match = sequences[..., n_value:, :] == sequences[..., :-n_value, :]
+    codes = outcome_codes(actual_match, responses[..., n_value:, :])
+    return np.stack([(codes == code).sum(axis=-2) for code in range(NUM_OUTCOMES)], axis=-1)
+
+
+class ScoreSummary:
+    """Signal-detection summary built from outcome counts of shape (..., channels, NUM_OUTCOMES)."""
+
+    def __init__(self, counts):
+        self.counts = np.asarray(counts)
+        self.hits = self.counts[..., HIT]
+        self.misses = self.counts[..., MISS]
+        self.correct_rejections = self.counts[..., CORRECT_REJECTION]
+        self.false_alarms = self.counts[..., FALSE_ALARM]
+
+    @property
+    def score(self):
+        """Legacy NBackGame score: correct responses summed over channels."""
+        return (self.hits + self.correct_rejections).sum(axis=-1)
+
+    @property
+    def hit_rate(self):
+        """Log-linear corrected hit rate, so d' stays finite for perfect or empty channels."""
+        return (self.hits + 0.5) / (self.hits + self.misses + 1.0)
+
+    @property
+    def false_alarm_rate(self):
+        """Log-linear corrected false-alarm rate."""
+        return (self.false_alarms + 0.5) / (self.false_alarms + self.correct_rejections + 1.0)
+
+    @property
+    def d_prime(self):
+        return norm_ppf(self.hit_rate) - norm_ppf(self.false_alarm_rate)
+
+    @property
+    def criterion(self):
+        return -0.5 * (norm_ppf(self.hit_rate) + norm_ppf(self.false_alarm_rate))
+
+
+def score_sessions(sequences, responses, n_value):
+    """Scores one session or a stack of sessions in a single vectorized pass."""
+    return ScoreSummary(outcome_counts(sequences, responses, n_value))
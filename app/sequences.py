@@ -0,0 +1,86 @@
+import numpy as np
+
+
+def _as_per_channel(value, num_channels, name):
+    """Broadcasts a scalar or per-channel sequence to a tuple of length num_channels."""
+    if np.ndim(value) == 0:
+        return (value,) * num_channels
+    value = tuple(value)
+    if len(value) != num_channels:
+        raise ValueError(f"{name} must have one entry per channel ({num_channels}), got {len(value)}.")
+    return value
+
+
+def _match_mask(rng, num_sessions, scorable, probability, exact):
+    """Returns a (sessions, scorable) bool mask marking which scorable trials are N-back matches."""
+    if not exact:
+        return rng.random((num_sessions, scorable)) < probability
+    num_matches = int(round(probability * scorable))
+    mask = np.zeros((num_sessions, scorable), dtype=bool)
+    if num_matches:
+        # Random keys + argsort picks exactly num_matches distinct positions per session
+        chosen = np.argsort(rng.random((num_sessions, scorable)), axis=1)[:, :num_matches]
+        np.put_along_axis(mask, chosen, True, axis=1)
+    return mask
+
+
+def _channel_sequences(rng, num_sessions, total_length, n_value, num_options, probability, exact):
+    """Generates one channel for all sessions, shape (sessions, total_length)."""
+    if probability is None:
+        return rng.integers(0, num_options, size=(num_sessions, total_length), dtype=np.uint8)
+    if num_options < 2:
+        raise ValueError("Controlled match rates need at least 2 stimulus options per channel.")
+
+    # Trial t only depends on trial t - n_value, so the sequence splits into n_value independent
+    # chains (t mod n_value). Along a chain a match repeats the previous value and a non-match adds
+    # a non-zero offset, which turns generation into a cumulative sum modulo num_options.
+    num_rows = -(-total_length // n_value)
+    padded_length = num_rows * n_value
+    scorable = total_length - n_value
+
+    steps = np.zeros((num_sessions, padded_length), dtype=np.int64)
+    steps[:, :n_value] = rng.integers(0, num_options, size=(num_sessions, n_value))
+    offsets = rng.integers(1, num_options, size=(num_sessions, padded_length - n_value))
+    offsets[:, :scorable][_match_mask(rng, num_sessions, scorable, probability, exact)] = 0
+    steps[:, n_value:] = offsets
+
+    chains = np.cumsum(steps.reshape(num_sessions, num_rows, n_value), axis=1) % num_options
+    return chains.reshape(num_sessions, padded_length)[:, :total_length].astype(np.uint8)
+
+
+def generate_sequence_batch(num_sessions, sequence_length, n_value, num_options=(9, 9),
+                            match_probability=None, exact=True, rng=None):
+    """Generates stimulus sequences for many sessions at once.
+
+    Returns a uint8 array of shape (num_sessions, sequence_length + n_value, channels), laid out the
+    same way as NBackGame sequences: the first n_value trials are observe-only and every later trial
+    is scored against the trial n_value positions earlier.
+
+    num_options and match_probability take a scalar or one entry per channel. A match_probability of
+    None keeps the plain uniform draw of NBackGame.generate_sequences. With exact=True every session
+    gets round(p * sequence_length) matches per channel, otherwise each scorable trial is a match
+    independently with probability p.
+    """
+    if not 1 <= n_value <= 9:
+        raise ValueError("N-value must be between 1 and 9.")
+    if sequence_length < 0 or num_sessions < 0:
+        raise ValueError("num_sessions and sequence_length must be non-negative.")
+    num_options = tuple(int(x) for x in np.atleast_1d(num_options))
+    if any(not 1 <= x <= 256 for x in num_options):
+        raise ValueError("Each channel must have between 1 and 256 stimulus options.")
+    probabilities = _as_per_channel(match_probability, len(num_options), "match_probability")
+    for p in probabilities:
+        if p is not None and not 0.0 <= p <= 1.0:
+            raise ValueError("match_probability must be between 0 and 1.")
+
+    rng = np.random.default_rng(rng)
+    total_length = sequence_length + n_value
+    batch = np.empty((num_sessions, total_length, len(num_options)), dtype=np.uint8)
+    for channel, (options, p) in enumerate(zip(num_options, probabilities)):
+        batch[:, :, channel] = _channel_sequences(rng, num_sessions, total_length, n_value, options, p, exact)
+    return batch
+
+
+def match_rates(batch, n_value):
+    """Returns the observed N-back match rate per session and channel, shape (sessions, channels)."""
+    return (batch[:, n_value:, :] == batch[:, :-n_value, :]).mean(axis=1)
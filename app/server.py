@@ -0,0 +1,306 @@
+"""Headless multi-session N-back server on asyncio.
+
+Clients connect over TCP and exchange newline-delimited JSON messages, one object per line. Client to server:
+
+    {"op": "start", "n": 2, "trials": 20, "channels": [9, 9], "seed": 123}   channels and seed optional
+    {"op": "press", "channel": 0}       match press for the stimulus currently presented
+    {"op": "stop"}                      ends the session early
+    {"op": "stats", "reset": false}     server-wide timing statistics
+
+Server to client: {"event": "started" | "stimulus" | "press" | "over" | "stats" | "error", ...}. Stimulus
+offsets are not sent: "started" carries the timing, so clients clear each stimulus on their own and the
+server makes one socket write per trial instead of two.
+
+Every session runs on the one event loop: its TrialScheduler arms a single loop timer at a time, so there
+is no thread or task per session, and its state is the compact MultiNBackGame (one byte per trial and
+channel, one bit per response) plus an integer of the current trial's presses.
+
+    python -m app.server [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import time
+from array import array
+from itertools import count
+
+import numpy as np
+
+from app.core import MultiNBackGame
+from app.scheduler import TrialScheduler, timing_summary
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+DEFAULT_PORT = 8765
+MAX_TRIALS = 1000  # Per session, so a client cannot make the server allocate arbitrarily large games
+MAX_CHANNELS = 8
+MAX_WRITE_BUFFER = 1 << 16  # Bytes queued for a client that stopped reading before its session is dropped
+
+
+def _integer(value, name):
+    """Returns value if it is a JSON integer (bools are not), else raises ValueError naming the field."""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be an integer, got {value!r}.")
+    return value
+
+
+def _write_message(writer, message):
+    """Writes one JSON line to a client; returns False if it was not sent because the connection is closing.
+
+    A client whose unsent replies exceed MAX_WRITE_BUFFER has stopped reading and is disconnected instead.
+    """
+    if writer.is_closing():
+        return False
+    if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+        writer.close()  # Don't let the queue of a client that stopped reading grow without bound
+        return False
+    writer.write(json.dumps(message).encode() + b"\n")
+    return True
+
+
+async def _read_line(reader):
+    """Returns the next line from a client, b"" at EOF, or None if it was longer than the stream limit.
+
+    An overlong line is discarded up to its newline, so the client's next message is still read whole.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial  # Unterminated last line, or b"" at EOF
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    try:
+        while True:
+            await reader.readexactly(consumed)  # Already buffered: everything scanned so far
+            try:
+                await reader.readuntil(b"\n")
+                return None
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+    except asyncio.IncompleteReadError:
+        return None  # Closed mid-line; the next read sees EOF
+
+
+class LatencyRecorder:
+    """Fixed-capacity ring buffer of durations in seconds, like TrialEventBuffer, with percentile summaries."""
+
+    __slots__ = ("capacity", "samples", "count")
+
+    def __init__(self, capacity=1 << 18):
+        self.capacity = capacity
+        self.samples = array('d', bytes(8 * capacity))
+        self.count = 0
+
+    def record(self, value):
+        self.samples[self.count % self.capacity] = value
+        self.count += 1
+
+    def reset(self):
+        self.count = 0
+
+    def summary(self):
+        """Returns mean, p50, p95, p99 and max in milliseconds over the buffered samples, or None if empty."""
+        values = np.frombuffer(self.samples, dtype=np.float64)[:min(self.count, self.capacity)]
+        return timing_summary(values, (50, 95, 99), count_key="samples", scale=1000)
+
+
+class ServerSession:
+    """One client's game: its core state, the current trial's presses and its trial timers."""
+
+    __slots__ = ("server", "session_id", "writer", "game", "scheduler", "pressed")
+
+    def __init__(self, server, session_id, writer, game):
+        self.server = server
+        self.session_id = session_id
+        self.writer = writer
+        self.game = game
+        self.scheduler = TrialScheduler(server.schedule_once, self._on_onset, self._on_offset,
+                                        server.stimulus_duration, server.inter_stimulus_interval, server.lead_in)
+        self.pressed = 0  # Bit c set once channel c was pressed for the current trial
+
+    def start(self):
+        self.game.generate_sequences()
+        # One onset per trial plus the final one that scores the last response and ends the game
+        self.scheduler.start(self.game.sequence_length + 1)
+
+    def press(self, channel):
+        """Records a match press on channel for the trial being presented; returns that trial's index."""
+        trial = self.game.current_trial_index - 1
+        if trial < 0 or not self.scheduler.running:
+            raise ValueError("No stimulus is being presented.")
+        self.pressed |= 1 << channel
+        return trial
+
+    def _on_onset(self, dt):
+        game = self.game
+        self.server.timer_lateness.record(time.perf_counter() -
+                                          self.scheduler.onset_deadline(self.scheduler.trial_index))
+        # As on the game screen, the presses of the previous trial are scored when the next one starts
+        if game.current_trial_index > game.n_value:
+            game.record_responses([self.pressed >> channel & 1 for channel in range(game.num_channels)])
+        if game.is_game_over():
+            self.finish()
+            return
+        self.pressed = 0
+        stimuli = game.next_stimuli()
+        self.send({"event": "stimulus", "trial": game.current_trial_index - 1, "stimuli": stimuli})
+
+    def _on_offset(self, dt):
+        self.server.timer_lateness.record(time.perf_counter() -
+                                          self.scheduler.offset_deadline(self.scheduler.trial_index))
+
+    def finish(self):
+        """Ends the session and sends its result."""
+        self.close()
+        game = self.game
+        self.send({"event": "over", "score": game.get_score(), "max_score": game.get_max_possible_score(),
+                   "trials": game.get_current_trial_number(), "outcomes": game.outcome_counts.tolist()})
+
+    def close(self):
+        self.scheduler.cancel()
+        if self.server.sessions.get(self.session_id) is self:
+            del self.server.sessions[self.session_id]
+
+    def send(self, message):
+        if not _write_message(self.writer, message):
+            self.close()
+
+
+class GameServer:
+    """Hosts any number of concurrent sessions on the running event loop, one per connection.
+
+    Records how late trial timers fire (timer_lateness) and how long each client message takes to handle
+    (processing_latency), both in the ring buffers of LatencyRecorder.
+    """
+
+    def __init__(self, stimulus_duration=1.5, inter_stimulus_interval=0.5, lead_in=1.0):
+        self.stimulus_duration = stimulus_duration
+        self.inter_stimulus_interval = inter_stimulus_interval
+        self.lead_in = lead_in
+        self.sessions = {}  # session id -> ServerSession
+        self.sessions_started = 0
+        self.timer_lateness = LatencyRecorder()
+        self.processing_latency = LatencyRecorder()
+        self._session_ids = count(1)
+
+    @staticmethod
+    def schedule_once(callback, delay):
+        """Clock.schedule_once-like timer on the running loop, as TrialScheduler expects."""
+        return asyncio.get_running_loop().call_later(delay, callback, delay)
+
+    async def handle_client(self, reader, writer):
+        session = None
+        try:
+            while True:
+                line = await _read_line(reader)
+                if line is None:
+                    _write_message(writer, {"event": "error", "message": "Message too long."})
+                    continue
+                if not line:
+                    break
+                received = time.perf_counter()
+                try:
+                    message = json.loads(line)
+                    session = self._dispatch(message, session, writer)
+                except (ValueError, KeyError, TypeError, ArithmeticError) as e:  # Malformed or invalid message
+                    _write_message(writer, {"event": "error", "message": str(e)})
+                self.processing_latency.record(time.perf_counter() - received)
+        except ConnectionError:
+            pass
+        finally:
+            if session is not None:
+                session.close()
+            writer.close()
+
+    def _dispatch(self, message, session, writer):
+        """Handles one client message; returns the connection's session afterwards."""
+        op = message["op"]
+        if op == "press":
+            if session is None:
+                raise ValueError("No session started.")
+            channel = _integer(message["channel"], "channel")
+            if not 0 <= channel < session.game.num_channels:
+                raise ValueError(f"Channel must be between 0 and {session.game.num_channels - 1}.")
+            session.send({"event": "press", "trial": session.press(channel), "channel": channel})
+        elif op == "start":
+            trials = _integer(message.get("trials", 20), "trials")
+            if not 1 <= trials <= MAX_TRIALS:
+                raise ValueError(f"Trials must be between 1 and {MAX_TRIALS}.")
+            channels = message.get("channels", [9, 9])
+            if not isinstance(channels, list):
+                raise ValueError(f"channels must be a list of option counts, got {channels!r}.")
+            if len(channels) > MAX_CHANNELS:
+                raise ValueError(f"At most {MAX_CHANNELS} channels per session.")
+            channels = [_integer(options, "channels") for options in channels]
+            seed = message.get("seed")
+            # MultiNBackGame checks the ranges: seeds must fit the 32-bit stimulus generator
+            game = MultiNBackGame(_integer(message.get("n", 2), "n"), trials, channels,
+                                  None if seed is None else _integer(seed, "seed"))
+            new_session = ServerSession(self, next(self._session_ids), writer, game)
+            try:
+                new_session.start()
+            except Exception:
+                new_session.close()
+                raise
+            # Registered and announced only once started, so a failed start leaves nothing behind
+            if session is not None:
+                session.close()
+            session = new_session
+            self.sessions[session.session_id] = session
+            self.sessions_started += 1
+            session.send({"event": "started", "session": session.session_id, "seed": game.seed,
+                          "trials": game.sequence_length, "max_score": game.get_max_possible_score(),
+                          "lead_in": self.lead_in, "stimulus_duration": self.stimulus_duration,
+                          "inter_stimulus_interval": self.inter_stimulus_interval})
+        elif op == "stop":
+            if session is not None and session.scheduler.running:
+                session.finish()
+        elif op == "stats":
+            _write_message(writer, self.stats(reset=bool(message.get("reset"))))
+        else:
+            raise ValueError(f"Unknown op {op!r}.")
+        return session
+
+    def stats(self, reset=False):
+        """Returns the server-wide statistics message; reset clears the latency buffers afterwards."""
+        stats = {"event": "stats", "sessions": len(self.sessions), "sessions_started": self.sessions_started,
+                 "timer_lateness_ms": self.timer_lateness.summary(),
+                 "processing_ms": self.processing_latency.summary()}
+        if resource is not None:
+            stats["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if reset:
+            self.timer_lateness.reset()
+            self.processing_latency.reset()
+        return stats
+
+
+async def serve(host="127.0.0.1", port=DEFAULT_PORT, **options):
+    """Runs a GameServer until cancelled; options are passed to GameServer."""
+    server = GameServer(**options)
+    listener = await asyncio.start_server(server.handle_client, host, port, backlog=4096)
+    bound_host, bound_port = listener.sockets[0].getsockname()[:2]
+    print(f"N-back server listening on {bound_host}:{bound_port}", flush=True)  # Port 0 picks a free port
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--stimulus-duration", type=float, default=1.5)
+    parser.add_argument("--inter-stimulus-interval", type=float, default=0.5)
+    parser.add_argument("--lead-in", type=float, default=1.0)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, stimulus_duration=args.stimulus_duration,
+                          inter_stimulus_interval=args.inter_stimulus_interval, lead_in=args.lead_in))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+
+import numpy as np
+
+from app.core import stimulus_matrix
+from app.replay import MAX_RT_MS, NO_RT
+
+# File layout:
+#   file header   | magic (8s) | version (u16) | reserved (u16) | reserved (u32) |
+#   record *      | record header | stimuli | responses (channels x packed bits) | reaction times | trailer |
+# Stimuli are either stored (trials x channels, u8) or, with FLAG_SEEDED, replaced by the session's seed (u32)
+# and stimulus options (u16 per channel) they are regenerated from. With FLAG_PRESS_TIMES, reaction times
+# follow as u16 milliseconds, one per press in channel-major order.
+# The trailer repeats the record length next to a CRC32 of header + payload, so the last record can be
+# validated from the end of the file without scanning the log.
+MAGIC = b"NBACKLOG"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sHHI")
+RECORD_MARKER = 0x424E  # "NB"
+RECORD_HEADER = struct.Struct("<HBBHHHHd")  # marker, n_value, channels, trials, score, max_score, flags, timestamp
+RECORD_TRAILER = struct.Struct("<II")  # record length, crc32
+# Record header flags
+FLAG_PRESS_TIMES = 0x0001  # A reaction time per press
+FLAG_SEEDED = 0x0002  # Seed and stimulus options instead of the stimuli
+
+HEADER_DTYPE = np.dtype([("marker", "<u2"), ("n_value", "u1"), ("num_channels", "u1"), ("num_trials", "<u2"),
+                         ("score", "<u2"), ("max_score", "<u2"), ("flags", "<u2"), ("timestamp", "<f8")])
+
+
+def section_sizes(num_trials, num_channels, flags=0, num_presses=0):
+    """Returns the sizes in bytes of the (stimuli, responses, reaction times) sections of a record."""
+    stimuli = 4 + 2 * num_channels if flags & FLAG_SEEDED else num_trials * num_channels
+    responses = num_channels * ((num_trials + 7) // 8)
+    reaction_times = 2 * num_presses if flags & FLAG_PRESS_TIMES else 0
+    return stimuli, responses, reaction_times
+
+
+def record_length(num_trials, num_channels, flags=0, num_presses=0):
+    """Returns the size in bytes of a record holding num_trials trials (and num_presses press times)."""
+    return RECORD_HEADER.size + sum(section_sizes(num_trials, num_channels, flags, num_presses)) + RECORD_TRAILER.size
+
+
+def _record_length_at(data, offset):
+    """Returns (marker, length) of the record whose header starts at offset; the length may run past the data."""
+    marker, _, num_channels, num_trials, _, _, flags, _ = RECORD_HEADER.unpack_from(data, offset)
+    num_presses = 0
+    if flags & FLAG_PRESS_TIMES:
+        stimuli_size, responses_size, _ = section_sizes(num_trials, num_channels, flags)
+        start = offset + RECORD_HEADER.size + stimuli_size
+        num_presses = bin(int.from_bytes(data[start:start + responses_size], "little")).count("1")
+    return marker, record_length(num_trials, num_channels, flags, num_presses)
+
+
+def encode_session(n_value, sequences, responses, score, max_score, timestamp, reaction_times=None, seed=None,
+                   num_options=None):
+    """Packs one session into a log record.
+
+    sequences is a (trials, channels) uint8 array and responses a bool array of the same shape.
+    reaction_times, if given, is a float array of that shape in seconds, NaN where there was no press; one
+    is stored per press. If seed is given, sequences must equal stimulus_matrix(seed, trials, num_options)
+    and only the seed and num_options are stored.
+    """
+    sequences = np.ascontiguousarray(sequences, dtype=np.uint8)
+    num_trials, num_channels = sequences.shape
+    masks = np.asarray(responses, dtype=bool).T  # Channel-major, like the packed rows
+    flags = 0
+    if seed is None:
+        payload = sequences.tobytes()
+    else:
+        flags |= FLAG_SEEDED
+        payload = struct.pack("<I", seed) + np.array(num_options, dtype="<u2").tobytes()
+    payload += np.packbits(masks, axis=1, bitorder='little').tobytes()
+    if reaction_times is not None:
+        flags |= FLAG_PRESS_TIMES
+        milliseconds = np.asarray(reaction_times, dtype=np.float64).T[masks] * 1000
+        rts = np.full(milliseconds.shape, NO_RT, dtype="<u2")
+        known = ~np.isnan(milliseconds)
+        rts[known] = np.clip(np.rint(milliseconds[known]), 0, MAX_RT_MS)
+        payload += rts.tobytes()
+    body = RECORD_HEADER.pack(RECORD_MARKER, n_value, num_channels, num_trials, score, max_score, flags,
+                              timestamp) + payload
+    length = len(body) + RECORD_TRAILER.size
+    return body + RECORD_TRAILER.pack(length, zlib.crc32(body))
+
+
+def encode_game(game, timestamp=None, first_press=None):
+    """Packs a finished game into a log record.
+
+    first_press is the (trials, channels) array from game.reaction_times(), stored when given. Games
+    generated from their seed are stored as the seed, like a replay, rather than their stimuli.
+    """
+    sequences = game.stimuli
+    responses = np.zeros(sequences.shape, dtype=bool)
+    masks = game.response_masks()
+    responses[:masks.shape[1]] = masks.T
+    return encode_session(game.n_value, sequences, responses, game.get_score(), game.get_max_possible_score(),
+                          time.time() if timestamp is None else timestamp, first_press, game.seed, game.num_options)
+
+
+def _valid_tail_end(data, start, end):
+    """Returns the end offset of the last intact record in data[start:end], scanning forward."""
+    offset = start
+    while offset + RECORD_HEADER.size <= end:
+        marker, length = _record_length_at(data, offset)
+        if marker != RECORD_MARKER or offset + length > end:
+            break
+        stored_length, crc = RECORD_TRAILER.unpack_from(data, offset + length - RECORD_TRAILER.size)
+        if stored_length != length or zlib.crc32(data[offset:offset + length - RECORD_TRAILER.size]) != crc:
+            break
+        offset += length
+    return offset
+
+
+class SessionLogWriter:
+    """Appends completed sessions to a binary log.
+
+    Each append is a single write() on an O_APPEND descriptor, so the cost does not depend on the size of
+    the log. A record torn by a crash is detected from the trailer on the next open and cut off.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, "O_BINARY", 0), 0o644)
+        size = os.fstat(self._fd).st_size
+        if size < FILE_HEADER.size:
+            os.ftruncate(self._fd, 0)
+            os.write(self._fd, FILE_HEADER.pack(MAGIC, VERSION, 0, 0))
+            self._sync()
+        else:
+            magic, version, _, _ = FILE_HEADER.unpack(self._read_at(0, FILE_HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} session log.")
+            self._recover(size)
+
+    def _read_at(self, offset, size):
+        # os.pread is not available on Windows; O_APPEND writes ignore the file position anyway
+        os.lseek(self._fd, offset, os.SEEK_SET)
+        return os.read(self._fd, size)
+
+    def _recover(self, size):
+        """Drops a partially written last record, if any."""
+        if size == FILE_HEADER.size:
+            return
+        if size - FILE_HEADER.size >= RECORD_TRAILER.size:
+            length, crc = RECORD_TRAILER.unpack(self._read_at(size - RECORD_TRAILER.size, RECORD_TRAILER.size))
+            # A torn tail can end in any 8 bytes, so only trust a length that fits a record in the file
+            if RECORD_HEADER.size + RECORD_TRAILER.size <= length <= size - FILE_HEADER.size:
+                body = self._read_at(size - length, length - RECORD_TRAILER.size)
+                if len(body) >= RECORD_HEADER.size and struct.unpack_from("<H", body)[0] == RECORD_MARKER \
+                        and zlib.crc32(body) == crc:
+                    return  # Common case: the log ends with an intact record
+        with open(self.path, "rb") as f:
+            data = f.read()
+        os.ftruncate(self._fd, _valid_tail_end(data, FILE_HEADER.size, len(data)))
+        self._sync()
+
+    def _sync(self):
+        if self.fsync:
+            os.fsync(self._fd)
+
+    @property
+    def size(self):
+        """Current length of the log in bytes, which is where the next record will start."""
+        return os.fstat(self._fd).st_size
+
+    def append_record(self, record):
+        os.write(self._fd, record)
+        self._sync()
+
+    def append_game(self, game, timestamp=None, first_press=None):
+        """Appends a finished NBackGame, with its reaction times if first_press is given."""
+        self.append_record(encode_game(game, timestamp, first_press))
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SessionLogReader:
+    """Memory-mapped, read-only view of a session log.
+
+    Opening the reader only walks the record headers to build an offset index; stimuli and responses are
+    read from the page cache on demand, so slicing recent history never loads the whole file.
+    Passing start, the log size at an earlier point, indexes only the records appended since then.
+    """
+
+    def __init__(self, path, start=None):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(FILE_HEADER.size)
+            if len(header) < FILE_HEADER.size:
+                raise ValueError(f"{path} is too short to be a session log.")
+            magic, version, _, _ = FILE_HEADER.unpack(header)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} session log.")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._bytes = np.frombuffer(self._mmap, dtype=np.uint8)
+        try:
+            self.offsets = self._index(FILE_HEADER.size if start is None else start)
+        except ValueError:
+            self.close()
+            raise
+        self._headers = None
+
+    def _index(self, offset):
+        """Returns the start offset of every complete record from offset on."""
+        end = len(self._mmap)
+        if not FILE_HEADER.size <= offset <= end or (
+                offset + RECORD_HEADER.size <= end and _record_length_at(self._mmap, offset)[0] != RECORD_MARKER):
+            raise ValueError(f"Offset {offset} is not the start of a record in {self.path}.")
+        offsets = array('q')  # 8 bytes per record while indexing, not a list of int objects
+        while offset + RECORD_HEADER.size <= end:
+            marker, length = _record_length_at(self._mmap, offset)
+            if marker != RECORD_MARKER or offset + length > end:
+                break  # Torn tail left by a crash; the writer cuts it off on its next open
+            offsets.append(offset)
+            offset += length
+        return np.frombuffer(offsets, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def headers(self):
+        """Returns every record header as one structured array (n_value, score, timestamp, ...)."""
+        if self._headers is None:
+            gather = self.offsets[:, None] + np.arange(HEADER_DTYPE.itemsize)
+            self._headers = self._bytes[gather].view(HEADER_DTYPE).ravel()
+        return self._headers
+
+    def _record(self, index):
+        """Returns (header, start of the stimuli section, section sizes, responses) of one session."""
+        offset = int(self.offsets[index])
+        header = self._bytes[offset:offset + HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        num_trials, num_channels, flags = int(header["num_trials"]), int(header["num_channels"]), int(header["flags"])
+        start = offset + RECORD_HEADER.size
+        stimuli_size, responses_size, _ = section_sizes(num_trials, num_channels, flags)
+        packed = self._bytes[start + stimuli_size:start + stimuli_size + responses_size].reshape(num_channels, -1)
+        responses = np.unpackbits(packed, axis=1, count=num_trials, bitorder='little').astype(bool).T
+        sizes = section_sizes(num_trials, num_channels, flags, int(responses.sum()))
+        return header, start, sizes, responses
+
+    def session(self, index):
+        """Returns (header, sequences, responses) for one session.
+
+        sequences is a (trials, channels) uint8 array, a zero-copy view into the map unless the record only
+        holds the seed; responses is an unpacked bool array.
+        """
+        header, start, (stimuli_size, _, _), responses = self._record(index)
+        num_trials, num_channels = responses.shape
+        if header["flags"] & FLAG_SEEDED:
+            seed = int(self._bytes[start:start + 4].view("<u4")[0])
+            num_options = self._bytes[start + 4:start + stimuli_size].view("<u2").tolist()
+            sequences = stimulus_matrix(seed, num_trials, num_options)
+        else:
+            sequences = self._bytes[start:start + stimuli_size].reshape(num_trials, num_channels)
+        return header, sequences, responses
+
+    def reaction_times(self, index):
+        """Returns the (trials, channels) reaction times of one session in seconds (NaN without a press), or
+        None if the session was logged without them."""
+        header, start, (stimuli_size, responses_size, times_size), responses = self._record(index)
+        if not header["flags"] & FLAG_PRESS_TIMES:
+            return None
+        start += stimuli_size + responses_size
+        stored = self._bytes[start:start + times_size].view("<u2")
+        rts = np.full(responses.T.shape, np.nan)  # Press times are stored channel-major
+        rts[responses.T] = np.where(stored == NO_RT, np.nan, stored / 1000)
+        return rts.T
+
+    def record_bytes(self, indices, start, size):
+        """Gathers bytes [start, start + size) of each record in indices into one (len(indices), size) array.
+
+        start is one offset for all records or an array with one per index. Lets callers decode a whole
+        batch of same-shaped records with a few vectorized operations.
+        """
+        return self._bytes[self.offsets[indices][:, None] + np.asarray(start)[..., None] + np.arange(size)]
+
+    def iter_sessions(self, start=0, stop=None):
+        """Streams sessions in file order without materializing the range."""
+        for index in range(*slice(start, stop).indices(len(self))):
+            yield self.session(index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.session(index) for index in range(*key.indices(len(self)))]
+        return self.session(key)
+
+    def close(self):
+        # Views handed out by session() keep the map alive until they are released
+        self._bytes = None
+        self._headers = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
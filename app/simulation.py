@@ -0,0 +1,90 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.scoring import ScoreSummary, outcome_counts
+from app.sequences import generate_sequence_batch
+
+
+class PlayerModel:
+    """Parameterized synthetic player used to replay sessions headlessly.
+
+    hit_rate and false_alarm_rate are the press probabilities on match / non-match trials at N=1.
+    lapse_rate is the chance the player misses a trial entirely (no press on either channel).
+    n_decay multiplies hit_rate once per N above 1, modelling the drop in accuracy as N grows.
+    """
+
+    def __init__(self, hit_rate=0.8, false_alarm_rate=0.1, lapse_rate=0.02, n_decay=0.9):
+        for name, value in (("hit_rate", hit_rate), ("false_alarm_rate", false_alarm_rate),
+                            ("lapse_rate", lapse_rate), ("n_decay", n_decay)):
+            if not 0.0 <= value <= 1.0:
+                raise ValueError(f"{name} must be between 0 and 1.")
+        self.hit_rate = hit_rate
+        self.false_alarm_rate = false_alarm_rate
+        self.lapse_rate = lapse_rate
+        self.n_decay = n_decay
+
+    def effective_hit_rate(self, n_value):
+        """Returns the hit rate after N-dependent decay."""
+        return self.hit_rate * self.n_decay ** (n_value - 1)
+
+    def respond(self, sequences, n_value, rng):
+        """Returns simulated button presses, a bool array with the same shape as sequences."""
+        num_sessions, total_length, num_channels = sequences.shape
+        actual_match = np.zeros(sequences.shape, dtype=bool)
+        actual_match[:, n_value:, :] = sequences[:, n_value:, :] == sequences[:, :-n_value, :]
+
+        press_probability = np.where(actual_match, self.effective_hit_rate(n_value), self.false_alarm_rate)
+        pressed = rng.random(sequences.shape) < press_probability
+        lapsed = rng.random((num_sessions, total_length, 1)) < self.lapse_rate
+        pressed &= ~lapsed
+        pressed[:, :n_value, :] = False  # Buttons are disabled during the first N trials
+        return pressed
+
+
+def _simulate_chunk(player, num_sessions, n_value, sequence_length, num_options, match_probability, seed):
+    """Worker entry point: simulates one chunk of sessions and returns their scores."""
+    rng = np.random.default_rng(seed)
+    sequences = generate_sequence_batch(num_sessions, sequence_length, n_value, num_options,
+                                        match_probability=match_probability, rng=rng)
+    responses = player.respond(sequences, n_value, rng)
+    return ScoreSummary(outcome_counts(sequences, responses, n_value)).score.astype(np.int32)
+
+
+def simulate_sessions(player, num_sessions, n_value=2, sequence_length=20, num_options=(9, 9),
+                      match_probability=None, seed=None, chunk_size=50_000, processes=None):
+    """Simulates num_sessions games of a PlayerModel and returns their scores as an int32 array.
+
+    Sessions are split into chunks of chunk_size and spread across a process pool. Each chunk gets its
+    own child seed, so results are reproducible for a given seed regardless of the number of processes.
+    processes=1 runs everything in the calling process.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    chunk_sizes = [chunk_size] * (num_sessions // chunk_size)
+    if num_sessions % chunk_size:
+        chunk_sizes.append(num_sessions % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    jobs = [(player, size, n_value, sequence_length, num_options, match_probability, child)
+            for size, child in zip(chunk_sizes, seeds)]
+
+    if not jobs:
+        return np.empty(0, dtype=np.int32)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) == 1:
+        return np.concatenate([_simulate_chunk(*job) for job in jobs])
+    with ProcessPoolExecutor(max_workers=min(processes, len(jobs))) as pool:
+        return np.concatenate(list(pool.map(_simulate_chunk, *zip(*jobs))))
+
+
+def score_distribution(scores, max_score):
+    """Aggregates simulated scores into a histogram and summary statistics."""
+    scores = np.asarray(scores)
+    return {
+        "histogram": np.bincount(scores, minlength=max_score + 1),
+        "mean": float(scores.mean()),
+        "std": float(scores.std()),
+        "percentiles": dict(zip((5, 25, 50, 75, 95), np.percentile(scores, (5, 25, 50, 75, 95)).tolist())),
+        "accuracy": float(scores.mean() / max_score) if max_score else 0.0,
+    }
@@ -0,0 +1,223 @@
+import heapq
+import os
+import time
+import zipfile
+
+import numpy as np
+
+NUM_ACCURACY_BINS = 101  # Quantile sketch resolution: 1 % accuracy per bin
+INDEX_VERSION = 1  # Saved StatsIndex layout
+# UTC offsets only change on quarter-hour boundaries, so one lookup per quarter hour covers every timestamp in it
+_OFFSET_BUCKET = 900
+
+
+def _utc_offsets(timestamps):
+    """Returns the local UTC offset in seconds in effect at each timestamp (DST included)."""
+    buckets, inverse = np.unique(timestamps // _OFFSET_BUCKET, return_inverse=True)
+    offsets = np.array([time.localtime(bucket * _OFFSET_BUCKET).tm_gmtoff for bucket in buckets.tolist()],
+                       dtype=np.float64)
+    return offsets[inverse].reshape(timestamps.shape)
+
+
+def day_key(timestamp):
+    """Returns the local day number of a unix timestamp; works on scalars and arrays.
+
+    Each timestamp uses the UTC offset in effect at that moment, so days stay aligned across DST changes
+    and incremental updates and bulk rebuilds agree on the day of a session.
+    """
+    timestamp = np.asarray(timestamp, dtype=np.float64)
+    if timestamp.ndim == 0:  # Incremental updates: one session at a time
+        return (timestamp + time.localtime(float(timestamp)).tm_gmtoff) // 86400
+    return (timestamp + _utc_offsets(timestamp)) // 86400
+
+
+def _accuracy_bins(scores, max_scores):
+    """Maps scores to histogram bins of 1 % accuracy."""
+    scores = np.asarray(scores, dtype=np.float64)
+    max_scores = np.asarray(max_scores, dtype=np.float64)
+    accuracy = np.divide(scores, max_scores, out=np.zeros_like(scores), where=max_scores > 0)
+    return np.clip(np.rint(accuracy * 100), 0, 100).astype(np.intp)
+
+
+class ScoreStats:
+    """Running statistics for one group of sessions.
+
+    Every update is O(log k): Welford's running mean/variance, a min-heap holding the top k sessions and a
+    fixed 101-bin accuracy histogram used as the quantile sketch.
+    """
+
+    __slots__ = ("k", "count", "mean", "_m2", "histogram", "_top")
+
+    def __init__(self, k=10):
+        self.k = k
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.histogram = np.zeros(NUM_ACCURACY_BINS, dtype=np.int64)
+        self._top = []  # Min-heap of (accuracy, score, timestamp)
+
+    def update(self, score, max_score, timestamp):
+        self.count += 1
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (score - self.mean)
+        self.histogram[_accuracy_bins(score, max_score)] += 1
+
+        entry = (score / max_score if max_score else 0.0, score, timestamp)
+        if len(self._top) < self.k:
+            heapq.heappush(self._top, entry)
+        elif entry > self._top[0]:
+            heapq.heapreplace(self._top, entry)
+
+    @classmethod
+    def from_arrays(cls, scores, max_scores, timestamps, k=10):
+        """Builds the statistics for a whole group of sessions in one vectorized pass."""
+        stats = cls(k)
+        scores = np.asarray(scores, dtype=np.float64)
+        stats.count = len(scores)
+        if stats.count:
+            stats.mean = float(scores.mean())
+            stats._m2 = float(((scores - stats.mean) ** 2).sum())
+            stats.histogram = np.bincount(_accuracy_bins(scores, max_scores), minlength=NUM_ACCURACY_BINS)
+            max_scores = np.asarray(max_scores, dtype=np.float64)
+            accuracy = np.divide(scores, max_scores, out=np.zeros_like(scores), where=max_scores > 0)
+            best = np.lexsort((timestamps, scores, accuracy))[-k:]
+            stats._top = [(float(accuracy[i]), int(scores[i]), float(timestamps[i])) for i in best]
+            heapq.heapify(stats._top)
+        return stats
+
+    def merge(self, other):
+        """Folds the statistics of a disjoint group of sessions into this one (Chan's parallel update)."""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.histogram = self.histogram + other.histogram
+        self._top = heapq.nlargest(self.k, self._top + other._top)
+        heapq.heapify(self._top)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def top(self):
+        """Returns the best sessions as (accuracy, score, timestamp), best first."""
+        return sorted(self._top, reverse=True)
+
+    def best(self):
+        return max(self._top) if self._top else None
+
+    def quantile(self, q):
+        """Returns the approximate q-quantile of accuracy (0..1) from the histogram sketch."""
+        if not self.count:
+            return None
+        cumulative = np.cumsum(self.histogram)
+        return int(np.searchsorted(cumulative, max(q * self.count, 1))) / 100
+
+
+class StatsIndex:
+    """Leaderboard and statistics keyed by N-value and by local day, maintained incrementally."""
+
+    def __init__(self, k=10):
+        self.k = k
+        self.overall = ScoreStats(k)
+        self.by_n = {}
+        self.by_day = {}
+
+    def record(self, n_value, score, max_score, timestamp=None):
+        """Adds one finished session."""
+        timestamp = time.time() if timestamp is None else timestamp
+        self.overall.update(score, max_score, timestamp)
+        for groups, key in ((self.by_n, int(n_value)), (self.by_day, int(day_key(timestamp)))):
+            if key not in groups:
+                groups[key] = ScoreStats(self.k)
+            groups[key].update(score, max_score, timestamp)
+
+    def record_game(self, game, timestamp=None):
+        self.record(game.n_value, game.get_score(), game.get_max_possible_score(), timestamp)
+
+    @classmethod
+    def from_headers(cls, headers, k=10):
+        """Rebuilds the index from SessionLogReader.headers() (or any array with the same fields)."""
+        index = cls(k)
+        scores, max_scores, timestamps = headers["score"], headers["max_score"], headers["timestamp"]
+        index.overall = ScoreStats.from_arrays(scores, max_scores, timestamps, k)
+        for groups, keys in ((index.by_n, headers["n_value"]), (index.by_day, day_key(timestamps))):
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.searchsorted(inverse[order], np.arange(len(unique_keys) + 1))
+            for key, start, stop in zip(unique_keys.tolist(), bounds[:-1], bounds[1:]):
+                rows = order[start:stop]
+                groups[int(key)] = ScoreStats.from_arrays(scores[rows], max_scores[rows], timestamps[rows], k)
+        return index
+
+    @classmethod
+    def from_log(cls, reader, k=10):
+        return cls.from_headers(reader.headers(), k)
+
+    def merge(self, other):
+        """Folds in an index built from sessions not yet in this one, e.g. those appended to the log since
+        this index was saved."""
+        self.overall.merge(other.overall)
+        for groups, other_groups in ((self.by_n, other.by_n), (self.by_day, other.by_day)):
+            for key, stats in other_groups.items():
+                if key not in groups:
+                    groups[key] = ScoreStats(self.k)
+                groups[key].merge(stats)
+
+    def _groups(self):
+        yield 0, 0, self.overall
+        for kind, groups in ((1, self.by_n), (2, self.by_day)):
+            for key, stats in groups.items():
+                yield kind, key, stats
+
+    def save(self, path, log_offset):
+        """Writes the index to an .npz file along with log_offset, the size of the log it covers."""
+        groups = list(self._groups())
+        top = np.full((len(groups), self.k, 3), np.nan)
+        for row, (_, _, stats) in enumerate(groups):
+            if stats._top:
+                top[row, :len(stats._top)] = stats._top
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, version=INDEX_VERSION, k=self.k, log_offset=log_offset,
+                     kind=np.array([kind for kind, _, _ in groups], dtype=np.int8),
+                     key=np.array([key for _, key, _ in groups], dtype=np.int64),
+                     count=np.array([stats.count for _, _, stats in groups], dtype=np.int64),
+                     mean=np.array([stats.mean for _, _, stats in groups], dtype=np.float64),
+                     m2=np.array([stats._m2 for _, _, stats in groups], dtype=np.float64),
+                     histogram=np.array([stats.histogram for _, _, stats in groups], dtype=np.int64),
+                     top=top)
+        os.replace(path + ".tmp", path)  # A crash while saving leaves the previous index intact
+
+    @classmethod
+    def load(cls, path):
+        """Reads an index written by save(); returns (index, log_offset)."""
+        try:
+            data = np.load(path)
+        except zipfile.BadZipFile as e:  # Torn or foreign file
+            raise ValueError(f"{path} is not a statistics index.") from e
+        with data:
+            if int(data["version"]) != INDEX_VERSION:
+                raise ValueError(f"{path} is not a version {INDEX_VERSION} statistics index.")
+            index = cls(int(data["k"]))
+            groups = {0: None, 1: index.by_n, 2: index.by_day}
+            for kind, key, count, mean, m2, histogram, top in zip(
+                    data["kind"].tolist(), data["key"].tolist(), data["count"].tolist(), data["mean"].tolist(),
+                    data["m2"].tolist(), data["histogram"], data["top"]):
+                stats = ScoreStats(index.k)
+                stats.count, stats.mean, stats._m2, stats.histogram = count, mean, m2, histogram.copy()
+                stats._top = [(accuracy, int(score), timestamp)
+                              for accuracy, score, timestamp in top[~np.isnan(top[:, 0])].tolist()]
+                heapq.heapify(stats._top)
+                if kind == 0:
+                    index.overall = stats
+                else:
+                    groups[kind][key] = stats
+            return index, int(data["log_offset"])
+
+    def best_for_n(self, n_value):
+        stats = self.by_n.get(n_value)
+        return stats.best() if stats else None
@@ -0,0 +1,182 @@
+import math
+import time
+from array import array
+
+import numpy as np
+
+from app.core import session_seed, trial_stimulus_row
+from app.events import reaction_times
+from app.scoring import NUM_OUTCOMES, ScoreSummary, outcome_codes
+from app.tracing import trace_methods
+
+
+def stimulus_stream(seed, num_options=(9, 9), start=0):
+    """Lazily yields the stimuli (one per channel) of trials start, start + 1, ... of a seeded session,
+    without end.
+
+    The stream matches MultiNBackGame sequences for the same seed and num_options, trial by trial.
+    """
+    trial = start
+    while True:
+        yield trial_stimulus_row(seed, trial, num_options)
+        trial += 1
+
+
+@trace_methods("generate_sequences", "next_stimuli", "record_responses", category="core")
+class StreamingMultiNBackGame:
+    """Endless or timed N-back session with constant memory and constant per-trial cost.
+
+    Stimuli come from stimulus_stream(); only the last n_value + 1 stimuli of each channel are kept for
+    match checks. Scoring is incremental and exposes running statistics: outcome counts for the whole
+    session, accuracy over the last accuracy_window scored trials and a running reaction-time mean/variance.
+    The session ends after max_trials trials or time_limit seconds if either is given, otherwise it runs
+    until stopped. Channels are set by num_options, as for MultiNBackGame.
+    """
+
+    __slots__ = ("n_value", "num_options", "seed", "sequence_length", "time_limit", "accuracy_window", "clock",
+                 "current_trial_index", "score", "outcome_counts", "_stream", "_start_time", "_stimulus_window",
+                 "_correct_window", "_correct_in_window", "_num_scored", "_rt_count", "_rt_mean", "_rt_m2")
+
+    def __init__(self, n_value=2, num_options=(9, 9), seed=None, max_trials=None, time_limit=None,
+                 accuracy_window=20, clock=time.perf_counter):
+        if not 1 <= n_value <= 9:
+            raise ValueError("N-value must be between 1 and 9.")
+        num_options = tuple(int(x) for x in num_options)
+        if not num_options or any(not 1 <= x <= 256 for x in num_options):
+            raise ValueError("Need at least one channel, each with between 1 and 256 stimulus options.")
+        self.n_value = n_value
+        self.num_options = num_options
+        self.seed = session_seed(seed)
+        self.sequence_length = max_trials  # None for endless sessions
+        self.time_limit = time_limit
+        self.accuracy_window = accuracy_window
+        self.clock = clock
+        self._reset()
+
+    @property
+    def num_channels(self):
+        return len(self.num_options)
+
+    def _reset(self):
+        """Puts the session back before its first trial, with empty scores and statistics."""
+        self.current_trial_index = 0
+        self.score = 0
+        self.outcome_counts = array('I', [0]) * (self.num_channels * NUM_OUTCOMES)  # [channel * NUM_OUTCOMES + code]
+        self._stream = stimulus_stream(self.seed, self.num_options)
+        self._start_time = None
+        # Ring buffers: stimuli for the N-back comparison (one row of channels per slot) and per-trial
+        # correctness for rolling accuracy
+        self._stimulus_window = array('B', bytes((self.n_value + 1) * self.num_channels))
+        self._correct_window = array('B', bytes(self.accuracy_window))
+        self._correct_in_window = 0
+        self._num_scored = 0
+        self._rt_count = 0
+        self._rt_mean = 0.0
+        self._rt_m2 = 0.0
+
+    def generate_sequences(self):
+        """Restarts the session from its first trial; nothing is materialized."""
+        self._reset()
+
+    def next_stimuli(self):
+        """Advances to the next trial and returns its stimuli, or one None per channel once the session is over."""
+        if self.is_game_over():
+            return (None,) * self.num_channels
+        if self._start_time is None:
+            self._start_time = self.clock()
+        stimuli = next(self._stream)
+        slot = self.current_trial_index % (self.n_value + 1) * self.num_channels
+        self._stimulus_window[slot:slot + self.num_channels] = array('B', stimuli)
+        self.current_trial_index += 1
+        return stimuli
+
+    def record_responses(self, pressed):
+        """Scores the match presses (one per channel) for the stimulus just presented, with the same rules as
+        MultiNBackGame."""
+        if len(pressed) != self.num_channels:
+            raise ValueError(f"Expected one response per channel ({self.num_channels}), got {len(pressed)}.")
+        if self.current_trial_index <= self.n_value:
+            return
+        num_channels = self.num_channels
+        window = self._stimulus_window
+        presented = (self.current_trial_index - 1) % (self.n_value + 1) * num_channels
+        n_back = self.current_trial_index % (self.n_value + 1) * num_channels  # (presented - n_value) modulo ring size
+        correct = 0
+        for channel in range(num_channels):
+            outcome = outcome_codes(window[presented + channel] == window[n_back + channel], bool(pressed[channel]))
+            self.outcome_counts[channel * NUM_OUTCOMES + outcome] += 1
+            correct += outcome % 2 == 0
+        self.score += correct
+
+        slot = self._num_scored % len(self._correct_window)
+        self._correct_in_window += correct - self._correct_window[slot]
+        self._correct_window[slot] = correct
+        self._num_scored += 1
+
+    def add_reaction_time(self, seconds):
+        """Folds one reaction time into the running mean/variance (Welford)."""
+        self._rt_count += 1
+        delta = seconds - self._rt_mean
+        self._rt_mean += delta / self._rt_count
+        self._rt_m2 += delta * (seconds - self._rt_mean)
+
+    def get_current_trial_number(self):
+        return self.current_trial_index
+
+    def is_game_over(self):
+        if self.sequence_length is not None and self.current_trial_index >= self.sequence_length:
+            return True
+        return (self.time_limit is not None and self._start_time is not None
+                and self.clock() - self._start_time >= self.time_limit)
+
+    def get_score(self):
+        return self.score
+
+    def get_score_summary(self):
+        return ScoreSummary(np.array(self.outcome_counts, dtype=np.int64).reshape(self.num_channels, NUM_OUTCOMES))
+
+    def get_max_possible_score(self):
+        """Maximum score for the trials scored so far."""
+        return self._num_scored * self.num_channels
+
+    def rolling_accuracy(self):
+        """Fraction of correct responses over the last accuracy_window scored trials."""
+        scored = min(self._num_scored, len(self._correct_window))
+        return self._correct_in_window / (self.num_channels * scored) if scored else None
+
+    def reaction_time_stats(self):
+        """Returns (count, mean, standard deviation) of the reaction times added so far."""
+        std = math.sqrt(self._rt_m2 / (self._rt_count - 1)) if self._rt_count > 1 else 0.0
+        return self._rt_count, self._rt_mean, std
+
+    def reaction_times(self, events):
+        """Returns (first_press, press_counts) for the most recent trials still held in the event buffer."""
+        first_trial = max(0, self.current_trial_index - events.capacity)
+        if events.count:
+            first_trial = max(first_trial, int(events.snapshot()[2].min()))
+        return reaction_times(events, self.current_trial_index - first_trial, num_channels=self.num_channels,
+                              first_trial=first_trial)
+
+
+@trace_methods("record_response_and_score", category="core")
+class StreamingNBackGame(StreamingMultiNBackGame):
+    """Dual streaming session: a two-channel StreamingMultiNBackGame with visual and audio stimuli."""
+
+    __slots__ = ()
+
+    def __init__(self, n_value=2, num_positions=9, num_audio_stimuli=9, seed=None, max_trials=None,
+                 time_limit=None, accuracy_window=20, clock=time.perf_counter):
+        super().__init__(n_value, (num_positions, num_audio_stimuli), seed, max_trials, time_limit,
+                         accuracy_window, clock)
+
+    @property
+    def num_positions(self):
+        return self.num_options[0]
+
+    @property
+    def num_audio_stimuli(self):
+        return self.num_options[1]
+
+    def record_response_and_score(self, visual_match_pressed, audio_match_pressed):
+        """Scores the response to the stimulus just presented, with the same rules as NBackGame."""
+        self.record_responses((visual_match_pressed, audio_match_pressed))
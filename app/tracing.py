@@ -0,0 +1,233 @@
+import functools
+import json
+import os
+import threading
+import time
+from array import array
+
+# Event phases, as in the Chrome trace-event format
+COMPLETE = 0  # Span with a start and a duration ("X")
+COUNTER = 1  # Sampled value ("C")
+INSTANT = 2  # Point in time ("i")
+_PHASES = ("X", "C", "i")
+
+TRACE_ENV = "NBACK_TRACE"  # Set to an output path to trace the app from startup
+
+_tracer = None  # The active Tracer, or None while tracing is disabled
+_registry = []  # (class, method names, category) registered with trace_methods()
+
+
+class Tracer:
+    """Fixed-capacity ring buffer of spans, counters and instant events on the monotonic clock.
+
+    Storage is preallocated like TrialEventBuffer, so recording only writes into existing slots; names
+    and categories are interned to small integers. When more than capacity events are recorded, the
+    oldest ones are overwritten. Events may be recorded from any thread: the prefetch worker records spans
+    while the main thread does.
+    """
+
+    __slots__ = ("capacity", "clock", "starts", "durations", "phases", "names", "threads", "count",
+                 "_name_ids", "_thread_ids", "_origin", "_lock")
+
+    def __init__(self, capacity=65536, clock=time.perf_counter):
+        self.capacity = capacity
+        self.clock = clock
+        self.starts = array('d', bytes(8 * capacity))
+        self.durations = array('d', bytes(8 * capacity))  # Holds the value for counters
+        self.phases = array('B', bytes(capacity))
+        self.names = array('H', bytes(2 * capacity))
+        self.threads = array('B', bytes(capacity))
+        self.count = 0
+        self._name_ids = {}  # (name, category) -> id
+        self._thread_ids = {}  # threading.get_ident() -> small id
+        self._origin = clock()
+        self._lock = threading.Lock()  # Guards the slots, count and id tables
+
+    def intern(self, name, category="app"):
+        """Returns the id stored for (name, category), assigning one on first use."""
+        key = (name, category)
+        name_id = self._name_ids.get(key)
+        if name_id is None:
+            with self._lock:
+                name_id = self._name_ids.setdefault(key, len(self._name_ids))
+        return name_id
+
+    def _record(self, phase, name_id, start, duration):
+        ident = threading.get_ident()
+        with self._lock:
+            thread = self._thread_ids.get(ident)
+            if thread is None:
+                thread = self._thread_ids[ident] = len(self._thread_ids)
+            slot = self.count % self.capacity
+            self.starts[slot] = start
+            self.durations[slot] = duration
+            self.phases[slot] = phase
+            self.names[slot] = name_id
+            self.threads[slot] = thread
+            self.count += 1
+
+    def complete(self, name_id, start, end):
+        """Records a span from start to end (monotonic seconds)."""
+        self._record(COMPLETE, name_id, start, end - start)
+
+    def counter(self, name, value, category="app"):
+        self._record(COUNTER, self.intern(name, category), self.clock(), value)
+
+    def instant(self, name, category="app"):
+        self._record(INSTANT, self.intern(name, category), self.clock(), 0.0)
+
+    def span(self, name, category="app"):
+        """Context manager recording a span around its body."""
+        return _Span(self, self.intern(name, category))
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self._origin = self.clock()
+
+    def trace_events(self):
+        """Returns the buffered events as Chrome trace-event dicts, oldest first."""
+        with self._lock:  # Copy the buffer so recording threads are not held up while events are built
+            labels = {name_id: key for key, name_id in self._name_ids.items()}
+            count = self.count
+            starts, durations = array('d', self.starts), array('d', self.durations)
+            phases, names, threads = array('B', self.phases), array('H', self.names), array('B', self.threads)
+        size = min(count, self.capacity)
+        first = count - size
+        pid = os.getpid()
+        events = []
+        for index in range(first, count):
+            slot = index % self.capacity
+            name, category = labels[names[slot]]
+            phase = phases[slot]
+            event = {"name": name, "cat": category, "ph": _PHASES[phase], "pid": pid, "tid": threads[slot],
+                     "ts": (starts[slot] - self._origin) * 1e6}
+            if phase == COMPLETE:
+                event["dur"] = durations[slot] * 1e6
+            elif phase == COUNTER:
+                event["args"] = {name: durations[slot]}
+            else:
+                event["s"] = "t"
+            events.append(event)
+        return events
+
+    def export_chrome_trace(self, path):
+        """Writes the buffer as Chrome trace-event JSON, viewable in chrome://tracing or Perfetto."""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
+        return path
+
+
+class _Span:
+    __slots__ = ("tracer", "name_id", "start")
+
+    def __init__(self, tracer, name_id):
+        self.tracer = tracer
+        self.name_id = name_id
+
+    def __enter__(self):
+        self.start = self.tracer.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.complete(self.name_id, self.start, self.tracer.clock())
+
+
+def get_tracer():
+    """Returns the active Tracer, or None while tracing is disabled."""
+    return _tracer
+
+
+def _traced(function, name, category):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        tracer = _tracer
+        if tracer is None:  # Callbacks bound while tracing was on keep this wrapper after disable()
+            return function(*args, **kwargs)
+        clock = tracer.clock
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            tracer.complete(tracer.intern(name, category), start, clock())
+
+    wrapper.__wrapped_untraced__ = function
+    return wrapper
+
+
+def _patch(cls, method_names, category):
+    for method_name in method_names:
+        method = cls.__dict__[method_name]
+        if not hasattr(method, "__wrapped_untraced__"):
+            setattr(cls, method_name, _traced(method, f"{cls.__name__}.{method_name}", category))
+
+
+def _unpatch(cls, method_names):
+    for method_name in method_names:
+        method = cls.__dict__[method_name]
+        setattr(cls, method_name, getattr(method, "__wrapped_untraced__", method))
+
+
+def trace_methods(*method_names, category="app"):
+    """Class decorator registering methods to be traced as spans while tracing is enabled.
+
+    The methods are only wrapped by enable(), so they run untouched otherwise. Callbacks are often bound
+    when a widget is built, so enable tracing before building the objects to be traced.
+    """
+    def register(cls):
+        _registry.append((cls, method_names, category))
+        if _tracer is not None:
+            _patch(cls, method_names, category)
+        return cls
+    return register
+
+
+def enable(capacity=65536, clock=time.perf_counter):
+    """Starts tracing into a fresh Tracer and wraps every registered method; returns the Tracer."""
+    global _tracer
+    _tracer = Tracer(capacity, clock)
+    for cls, method_names, category in _registry:
+        _patch(cls, method_names, category)
+    return _tracer
+
+
+def disable():
+    """Stops tracing and restores the registered methods; returns the Tracer that was active."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    for cls, method_names, _ in _registry:
+        _unpatch(cls, method_names)
+    return tracer
+
+
+def trace_window_frames(window):
+    """Records a "frame" span from each Kivy window draw to its buffer flip."""
+    frame_start = [0.0]
+
+    def on_draw(*args):
+        frame_start[0] = _tracer.clock() if _tracer else 0.0
+
+    def on_flip(*args):
+        if _tracer and frame_start[0]:
+            _tracer.complete(_tracer.intern("frame", "render"), frame_start[0], _tracer.clock())
+
+    window.bind(on_draw=on_draw, on_flip=on_flip)
+
+
+def trace_screen_transitions(screen_manager):
+    """Records a span per screen transition, from the change of current screen to the transition's end."""
+    transition_start = {}
+
+    def on_current(manager, name):
+        if _tracer:
+            _tracer.instant(f"screen {name}", "screen")
+            transition_start[name] = _tracer.clock()
+
+    def on_complete(transition):
+        start = transition_start.pop(transition.screen_in.name if transition.screen_in else None, None)
+        if _tracer and start is not None:
+            _tracer.complete(_tracer.intern(f"transition to {transition.screen_in.name}", "screen"), start,
+                             _tracer.clock())
+
+    screen_manager.bind(current=on_current)
+    screen_manager.transition.bind(on_complete=on_complete)
@@ -0,0 +1,83 @@
+"""Headless audio stimulus timing: TrialScheduler + AudioStimulusEngine on a plain sleep-based loop.
+
+Plays a full session through the WAV-writing backend (no audio device needed), then reports visual onset
+jitter, audio issue latency after the visual onset and where each tone landed in the rendered file.
+
+    python -m benchmarks.audio_scheduling [output.wav]
+"""
+import heapq
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.audio import AudioStimulusEngine, WavFileAudioBackend
+from app.core import NBackGame
+from app.scheduler import TrialScheduler
+
+
+class SleepLoop:
+    """Minimal single-threaded timer loop with a Clock.schedule_once-like API."""
+
+    class _Event:
+        def __init__(self):
+            self.cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+    def __init__(self):
+        self._timers = []
+        self._counter = itertools.count()
+
+    def schedule_once(self, callback, delay):
+        event = self._Event()
+        heapq.heappush(self._timers, (time.perf_counter() + delay, next(self._counter), callback, event))
+        return event
+
+    def run(self):
+        while self._timers:
+            due, _, callback, event = heapq.heappop(self._timers)
+            time.sleep(max(0.0, due - time.perf_counter()))
+            if not event.cancelled:
+                callback(time.perf_counter() - due)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(tempfile.gettempdir(), "nback_audio.wav")
+    game = NBackGame(n_value=2, sequence_length=20)
+    game.generate_sequences()
+    backend = WavFileAudioBackend(path)
+    engine = AudioStimulusEngine(backend)
+    engine.prepare(game.num_audio_stimuli, game.sequence_length)
+    loop = SleepLoop()
+
+    def on_onset(dt):
+        visual, audio = game.next_stimuli()
+        if visual is None:
+            scheduler.cancel()
+            return
+        engine.play(audio, time.perf_counter())
+
+    scheduler = TrialScheduler(loop.schedule_once, on_onset, lambda dt: None,
+                               stimulus_duration=0.1, inter_stimulus_interval=0.05, lead_in=0.05)
+    scheduler.start(game.sequence_length + 1)
+    loop.run()
+    engine.close()
+
+    jitter, latency = scheduler.jitter_stats(), engine.issue_latency_stats()
+    print(f"visual onset error:  mean {jitter['mean'] * 1e3:.3f} ms, p95 {jitter['p95'] * 1e3:.3f} ms, "
+          f"max {jitter['max'] * 1e3:.3f} ms over {jitter['trials']} trials")
+    print(f"audio issued after:  mean {latency['mean'] * 1e6:.1f} us, p95 {latency['p95'] * 1e6:.1f} us, "
+          f"max {latency['max'] * 1e6:.1f} us")
+    played = np.array([timestamp for timestamp, _ in backend.played])
+    intervals = np.diff(played)
+    print(f"tone spacing in {path}: {intervals.mean() * 1e3:.2f} ms +/- {intervals.std() * 1e3:.3f} ms "
+          f"(period {(scheduler.stimulus_duration + scheduler.inter_stimulus_interval) * 1e3:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Columnar export of the session log: throughput, peak memory by history size, and a round-trip check.
+
+Writes synthetic logs of growing size (mixed N, two channels, reaction times for every press), exports
+each to .npz chunks and reports sessions per second, peak traced memory (which should not grow with the
+log) and bytes on disk. Then checks an incremental export against the log and times loading whole columns.
+
+    python -m benchmarks.columnar_export
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.export import NOT_SCORED, export_sessions, load_columns
+from app.scoring import NUM_OUTCOMES, outcome_counts
+from app.session_log import SessionLogReader, SessionLogWriter, encode_session
+
+SIZES = (25_000, 100_000, 400_000)
+SEQUENCE_LENGTH = 20
+BATCH_SIZE = 4096
+
+
+def write_log(path, num_sessions, first_seed=0):
+    rng = np.random.default_rng(first_seed)
+    with SessionLogWriter(path, fsync=False) as writer:
+        for _ in range(num_sessions):
+            n_value = int(rng.integers(1, 8))
+            sequences = rng.integers(0, 9, (SEQUENCE_LENGTH + n_value, 2), dtype=np.uint8)
+            responses = rng.random(sequences.shape) < 0.3
+            responses[:n_value] = False
+            counts = outcome_counts(sequences, responses, n_value)
+            score = int(counts[:, 0::2].sum())  # Hits and correct rejections
+            reaction_times = np.where(responses, rng.uniform(0.2, 1.5, sequences.shape), np.nan)
+            writer.append_record(encode_session(n_value, sequences, responses, score, SEQUENCE_LENGTH * 2,
+                                                1.7e9 + rng.random() * 1e7, reaction_times))
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def check(log_path, directory):
+    """Compares the exported columns with the log, session by session for a sample and in aggregate."""
+    sessions = load_columns(directory, "sessions")
+    trials = load_columns(directory)
+    with SessionLogReader(log_path) as reader:
+        assert len(sessions["session"]) == len(reader)
+        assert np.array_equal(sessions["score"], reader.headers()["score"])
+        for index in np.random.default_rng(1).choice(len(reader), 200, replace=False):
+            header, sequences, responses = reader[index]
+            rows = slice(sessions["first_row"][index], sessions["first_row"][index] + sequences.size)
+            assert (trials["session"][rows] == index).all()
+            assert np.array_equal(trials["stimulus"][rows], sequences.ravel())
+            assert np.array_equal(trials["pressed"][rows], responses.ravel())
+            expected = reader.reaction_times(index).ravel().astype(np.float32)
+            assert np.array_equal(trials["reaction_time"][rows], expected, equal_nan=True)
+    # Every session scores one point per correct scored trial and channel
+    per_session = np.bincount(trials["session"], weights=trials["correct"], minlength=len(sessions["session"]))
+    assert np.array_equal(per_session, sessions["score"])
+    scored = trials["outcome"] != NOT_SCORED
+    assert np.bincount(trials["outcome"][scored], minlength=NUM_OUTCOMES).sum() == scored.sum()
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        print(f"{'sessions':>9} {'log MiB':>8} {'export s':>9} {'sessions/s':>11} {'peak MiB':>9} "
+              f"{'npz MiB':>8}")
+        for num_sessions in SIZES:
+            log_path = os.path.join(root, f"{num_sessions}.log")
+            write_log(log_path, num_sessions)
+            directory = os.path.join(root, f"export-{num_sessions}")
+            start = time.perf_counter()
+            export_sessions(log_path, directory, BATCH_SIZE, "npz")
+            elapsed = time.perf_counter() - start
+
+            memory_directory = directory + "-traced"  # Measured in a separate run: tracing slows the export
+            tracemalloc.start()
+            export_sessions(log_path, memory_directory, BATCH_SIZE, "npz")
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{num_sessions:9d} {os.path.getsize(log_path) / 2**20:8.1f} {elapsed:9.2f} "
+                  f"{num_sessions / elapsed:11.0f} {peak / 2**20:9.1f} {directory_size(directory) / 2**20:8.1f}")
+
+        # Incremental export: sessions logged after a first export are appended as new chunks
+        log_path = os.path.join(root, "incremental.log")
+        directory = os.path.join(root, "export-incremental")
+        write_log(log_path, 10_000, first_seed=1)
+        export_sessions(log_path, directory, BATCH_SIZE)
+        write_log(log_path, 5_000, first_seed=2)
+        manifest = export_sessions(log_path, directory, BATCH_SIZE)
+        assert manifest["sessions"] == 15_000
+        check(log_path, directory)
+        print(f"incremental export of 10000 + 5000 sessions matches the log ({len(manifest['chunks'])} chunks)")
+
+        directory = os.path.join(root, f"export-{SIZES[-1]}")
+        start = time.perf_counter()
+        columns = load_columns(directory, columns=("outcome", "reaction_time"))
+        elapsed = time.perf_counter() - start
+        print(f"loading 2 columns of {len(columns['outcome'])} trial rows: {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Highlight churn on NBackGrid: time per stimulus onset/offset and allocated canvas instructions.
+
+Runs under a hidden Kivy window. LegacyGrid reproduces the old behaviour of rebuilding every cell's
+canvas on each highlight, for comparison.
+
+    python -m benchmarks.grid_highlight
+"""
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+from kivy.config import Config  # noqa: E402
+
+Config.set("graphics", "window_state", "hidden")
+
+from kivy.graphics import Color, Line, Rectangle  # noqa: E402
+
+from app.game_screen import NBackGrid  # noqa: E402
+
+NUM_TRIALS = 2000
+
+
+class LegacyGrid(NBackGrid):
+    """Previous NBackGrid rendering: clear and re-create all instructions of every cell on each change."""
+
+    def _rebuild(self, instance, highlighted):
+        instance.canvas.before.clear()
+        with instance.canvas.before:
+            Color(*(self.HIGHLIGHT_COLOR if highlighted else self.CELL_COLOR))
+            Rectangle(size=instance.size, pos=instance.pos)
+            Color(*self.BORDER_COLOR)
+            Line(rectangle=(instance.x + 1, instance.y + 1, instance.width - 2, instance.height - 2), width=1.2)
+
+    def highlight_cell(self, index):
+        for i, cell_label in enumerate(self.cells):
+            self._rebuild(cell_label, i == index)
+
+    def clear_highlight(self):
+        for cell_label in self.cells:
+            self._rebuild(cell_label, False)
+
+
+def churn(grid, indices):
+    """Presents and clears one stimulus per index; returns (seconds per trial, bytes still allocated)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    for index in indices:
+        grid.highlight_cell(index)
+        grid.clear_highlight()
+    elapsed = time.perf_counter() - start
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed / len(indices), allocated
+
+
+def canvas_size(grid):
+    return sum(len(cell.canvas.before.children) for cell in grid.cells)
+
+
+def main():
+    rng = random.Random(0)
+    for grid_size in (3, 4, 5):
+        indices = [rng.randrange(grid_size * grid_size) for _ in range(NUM_TRIALS)]
+        for name, grid_class in (("retained", NBackGrid), ("legacy", LegacyGrid)):
+            grid = grid_class(grid_size=grid_size, size=(600, 600))
+            grid.do_layout()
+            instructions = canvas_size(grid)
+            per_trial, peak = churn(grid, indices)
+            print(f"{grid_size}x{grid_size} {name:8s} {per_trial * 1e6:9.1f} us/trial  "
+                  f"peak traced {peak / 1024:8.1f} KiB  canvas instructions {instructions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Live widgets and memory across many play / game over / info cycles of GameScreen.
+
+Each cycle plays a session through the screen callbacks, which ends in the score popup, dismisses it
+back to the menu and opens and closes the info popup. Every SAMPLE_EVERY cycles it collects garbage and
+reports the number of live widgets, traced memory and the time gc.collect() took. With pooled popups the
+counts stay flat. LegacyGameScreen rebuilds both popups on every use, as GameScreen used to, for
+comparison.
+
+    python -m benchmarks.popup_pooling [cycles]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+from kivy.config import Config  # noqa: E402
+
+Config.set("graphics", "window_state", "hidden")
+Config.set("graphics", "maxfps", "0")
+
+from kivy.clock import Clock  # noqa: E402
+from kivy.uix.screenmanager import Screen, ScreenManager  # noqa: E402
+from kivy.uix.widget import Widget  # noqa: E402
+
+from app.audio import AudioStimulusEngine, NullAudioBackend  # noqa: E402
+from app.game_screen import GameScreen  # noqa: E402
+
+SAMPLE_EVERY = 50
+
+
+class LegacyGameScreen(GameScreen):
+    """Previous behaviour: a new score popup and a new info popup, with their bindings, on every use."""
+
+    def _get_score_popup(self):
+        self.score_popup = None
+        return super()._get_score_popup()
+
+    def _get_info_popup(self):
+        self.info_popup_instance = None
+        return super()._get_info_popup()
+
+
+def settle():
+    """Runs the clock until popup open/dismiss animations (shortened to zero) have completed."""
+    for _ in range(3):
+        Clock.tick()
+
+
+def cycle(manager, screen):
+    manager.current = 'game_screen'
+    screen.set_n_value(2)
+    screen.game_in_progress = False
+    screen.start_game_sequence()
+    screen.scheduler.cancel()  # The callbacks are driven directly below
+    while screen.game_in_progress:
+        screen.present_stimulus(0)
+        if screen.game_in_progress:
+            screen.clear_stimulus(0)
+    screen.score_popup._anim_duration = 0
+    settle()
+    screen.dismiss_score_popup(None)
+    settle()
+    screen.show_info_popup_on_press(None)
+    screen.info_popup_instance._anim_duration = 0
+    settle()
+    screen.dismiss_info_popup_on_release(None)
+    settle()
+
+
+def live_widgets():
+    return sum(issubclass(type(obj), Widget) for obj in gc.get_objects())  # type(): dead WeakProxy objects raise
+
+
+def run(screen_class, cycles):
+    manager = ScreenManager()
+    manager.add_widget(Screen(name='main_menu'))
+    screen = screen_class(name='game_screen')
+    screen.audio_engine = AudioStimulusEngine(NullAudioBackend())
+    manager.add_widget(screen)
+
+    print(f"{screen_class.__name__}:")
+    print(f"{'cycles':>8} {'live widgets':>13} {'traced KiB':>11} {'gc.collect ms':>14} {'ms/cycle':>9}")
+    tracemalloc.start()
+    start = time.perf_counter()
+    for index in range(1, cycles + 1):
+        cycle(manager, screen)
+        if index % SAMPLE_EVERY == 0:
+            per_cycle = (time.perf_counter() - start) / SAMPLE_EVERY
+            collect_start = time.perf_counter()
+            gc.collect()
+            collect_time = time.perf_counter() - collect_start
+            print(f"{index:8d} {live_widgets():13d} {tracemalloc.get_traced_memory()[0] / 1024:11.1f} "
+                  f"{collect_time * 1000:14.2f} {per_cycle * 1000:9.2f}")
+            start = time.perf_counter()
+    tracemalloc.stop()
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    run(GameScreen, cycles)
+    run(LegacyGameScreen, cycles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Replay encoding: size per session, encode and bulk re-scoring throughput.
+
+Plays NUM_SESSIONS seeded games with random responses and reaction times, encodes them as replays and
+session log records, and compares the sizes with a log record holding the stimuli and with JSON lists.
+Round trips are checked in tests/test_replay.py.
+
+    python -m benchmarks.replay_roundtrip
+"""
+import json
+import time
+
+import numpy as np
+
+from app.core import NBackGame
+from app.replay import encode_replay, rescore_replays
+from app.session_log import encode_game, encode_session
+
+NUM_SESSIONS = 20_000
+
+
+def play(seed, rng):
+    game = NBackGame(n_value=int(rng.integers(1, 8)), sequence_length=20, seed=seed)
+    game.generate_sequences()
+    presses = rng.random((game.sequence_length, 2)) < 0.3
+    while not game.is_game_over():
+        game.next_stimuli()
+        if game.get_current_trial_number() > game.n_value:
+            game.record_response_and_score(*presses[game.current_trial_index - 1])
+    first_press = np.where(game.response_masks().T, rng.uniform(0.2, 1.5, presses.shape), np.nan)
+    return game, first_press
+
+
+def main():
+    rng = np.random.default_rng(0)
+    played = [play(seed, rng) for seed in range(NUM_SESSIONS)]
+
+    start = time.perf_counter()
+    blobs = [encode_replay(game, first_press) for game, first_press in played]
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rescore_replays(blobs)
+    rescore_time = time.perf_counter() - start
+
+    replay_size = np.mean([len(blob) for blob in blobs])
+    log_size = np.mean([len(encode_game(game, 0, first_press)) for game, first_press in played[:1000]])
+    stimuli_log_size = np.mean([len(encode_session(  # The record of a game whose stimuli were loaded
+        game.n_value, game.stimuli, game.response_masks().T, game.get_score(), game.get_max_possible_score(), 0,
+        first_press)) for game, first_press in played[:1000]])
+    json_size = np.mean([len(json.dumps({
+        "visual_sequence": game.visual_sequence.tolist(), "audio_sequence": game.audio_sequence.tolist(),
+        "visual_responses": game.user_visual_responses_history, "audio_responses": game.user_audio_responses_history,
+        "reaction_times": np.nan_to_num(first_press).round(3).tolist()}))
+        for game, first_press in played[:1000]])
+
+    print(f"{NUM_SESSIONS} sessions, all with reaction times")
+    print(f"replay:          {replay_size:7.1f} bytes/session")
+    print(f"session log:     {log_size:7.1f} bytes/session (seeded record, 24 bytes of framing)")
+    print(f"  with stimuli:  {stimuli_log_size:7.1f} bytes/session")
+    print(f"JSON lists:      {json_size:7.1f} bytes/session")
+    print(f"encode:          {NUM_SESSIONS / encode_time:9.0f} sessions/s")
+    print(f"bulk re-score:   {NUM_SESSIONS / rescore_time:9.0f} sessions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Load test of app.server: N concurrent simulated clients each play a session over a local socket.
+
+Starts the server in a subprocess with shortened trial timing, then for each concurrency level connects
+that many clients, arriving at random over one trial period. Every client plays its session like a
+player: after a random reaction time it presses the channels that match N back (missing some, with
+occasional false alarms). Reports, per level, the server's trial-timer lateness and message processing
+time, the press round trip seen by the clients (which includes the load generator's own loop delay) and
+the server's peak memory.
+
+    python -m benchmarks.server_load [clients ...]
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+LEVELS = (10, 100, 1000, 4000)
+NUM_TRIALS = 20
+N_VALUE = 2
+STIMULUS_DURATION = 0.2
+INTER_STIMULUS_INTERVAL = 0.05
+LEAD_IN = 0.2
+HIT_RATE = 0.8
+FALSE_ALARM_RATE = 0.05
+
+
+async def start_server():
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "app.server", "--port", "0", "--stimulus-duration", str(STIMULUS_DURATION),
+        "--inter-stimulus-interval", str(INTER_STIMULUS_INTERVAL), "--lead-in", str(LEAD_IN),
+        stdout=asyncio.subprocess.PIPE)
+    line = (await process.stdout.readline()).decode()
+    port = int(line.rsplit(":", 1)[1])
+    return process, port
+
+
+async def request_stats(port, reset=False):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(json.dumps({"op": "stats", "reset": reset}).encode() + b"\n")
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+async def client(port, seed, round_trips):
+    """Plays one session; appends the round trip of every press to round_trips and returns the result."""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    await asyncio.sleep(rng.uniform(0, STIMULUS_DURATION + INTER_STIMULUS_INTERVAL))
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    sent = deque()  # Send times of unacknowledged presses; the server answers them in order
+
+    def press(channel):
+        sent.append(time.perf_counter())
+        writer.write(json.dumps({"op": "press", "channel": channel}).encode() + b"\n")
+
+    writer.write(json.dumps({"op": "start", "n": N_VALUE, "trials": NUM_TRIALS, "seed": seed}).encode() + b"\n")
+    history = []
+    result = None
+    async for line in reader:
+        message = json.loads(line)
+        event = message["event"]
+        if event == "stimulus":
+            trial, stimuli = message["trial"], message["stimuli"]
+            history.append(stimuli)
+            for channel, stimulus in enumerate(stimuli):
+                match = trial >= N_VALUE and history[trial - N_VALUE][channel] == stimulus
+                if rng.random() < (HIT_RATE if match else FALSE_ALARM_RATE):
+                    loop.call_later(rng.uniform(0.05, 0.15), press, channel)
+        elif event == "press":
+            round_trips.append(time.perf_counter() - sent.popleft())
+        elif event == "over":
+            result = message
+            break
+        elif event == "error":
+            raise RuntimeError(message["message"])
+    writer.close()
+    return result
+
+
+def format_summary(summary):
+    if summary is None:
+        return f"{'-':>7} {'-':>7} {'-':>7}"
+    return f"{summary['p50']:7.2f} {summary['p99']:7.2f} {summary['max']:7.2f}"
+
+
+async def run(levels):
+    if resource is not None:  # Two descriptors per client, one here and one in the server
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    process, port = await start_server()
+    session_time = LEAD_IN + (NUM_TRIALS + N_VALUE) * (STIMULUS_DURATION + INTER_STIMULUS_INTERVAL)
+    print(f"{NUM_TRIALS + N_VALUE} trials per session, {session_time:.1f} s each; all times in ms")
+    print(f"{'clients':>8} | {'timer lateness':^23} | {'server processing':^23} | {'press round trip':^23} | "
+          f"{'max RSS':>8}")
+    print(f"{'':>8} | {'p50':>7} {'p99':>7} {'max':>7} | {'p50':>7} {'p99':>7} {'max':>7} | "
+          f"{'p50':>7} {'p99':>7} {'max':>7} | {'MiB':>8}")
+    try:
+        for num_clients in levels:
+            await request_stats(port, reset=True)
+            round_trips = []
+            start = time.perf_counter()
+            results = await asyncio.gather(*(client(port, seed, round_trips) for seed in range(num_clients)))
+            elapsed = time.perf_counter() - start
+            stats = await request_stats(port)
+            assert all(result and result["trials"] == NUM_TRIALS + N_VALUE for result in results)
+            round_trip = None
+            if round_trips:
+                values = np.array(round_trips) * 1000
+                round_trip = {"p50": np.percentile(values, 50), "p99": np.percentile(values, 99),
+                              "max": values.max()}
+            rss = f"{stats['max_rss_kib'] / 1024:8.1f}" if "max_rss_kib" in stats else f"{'-':>8}"
+            print(f"{num_clients:8d} | {format_summary(stats['timer_lateness_ms'])} | "
+                  f"{format_summary(stats['processing_ms'])} | {format_summary(round_trip)} | {rss}"
+                  f"   ({elapsed:.1f} s)")
+    finally:
+        process.terminate()
+        await process.wait()
+
+
+def main():
+    levels = [int(arg) for arg in sys.argv[1:]] or LEVELS
+    asyncio.run(run(levels))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Per-session memory footprint of NBackGame.
+
+Plays NUM_SESSIONS complete sessions, keeps them alive and reports the bytes allocated per session,
+next to the same data held the way NBackGame used to store it (Python lists in a regular __dict__).
+
+    python -m benchmarks.session_memory
+"""
+import random
+import tracemalloc
+
+from app.core import NBackGame
+
+NUM_SESSIONS = 2000
+N_VALUE = 2
+SEQUENCE_LENGTH = 20
+
+
+class _ListSession:
+    """Reference layout: list-based stimuli and response histories in a regular instance __dict__."""
+
+    def __init__(self, game):
+        self.n_value = game.n_value
+        self.sequence_length = game.sequence_length
+        self.num_positions = game.num_positions
+        self.num_audio_stimuli = game.num_audio_stimuli
+        self.visual_sequence = game.visual_sequence.tolist()
+        self.audio_sequence = game.audio_sequence.tolist()
+        self.current_trial_index = game.current_trial_index
+        self.score = game.score
+        self.user_visual_responses_history = game.user_visual_responses_history
+        self.user_audio_responses_history = game.user_audio_responses_history
+
+
+def play_session(rng):
+    game = NBackGame(n_value=N_VALUE, sequence_length=SEQUENCE_LENGTH)
+    game.generate_sequences()
+    while not game.is_game_over():
+        game.next_stimuli()
+        if game.get_current_trial_number() > game.n_value:
+            game.record_response_and_score(rng.random() < 0.3, rng.random() < 0.3)
+    return game
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(sessions)
+
+
+def main():
+    rng = random.Random(0)
+    games = [play_session(rng) for _ in range(NUM_SESSIONS)]
+
+    compact = measure(lambda: [play_session(rng) for _ in range(NUM_SESSIONS)])
+    legacy = measure(lambda: [_ListSession(game) for game in games])
+
+    trials = N_VALUE + SEQUENCE_LENGTH
+    print(f"{NUM_SESSIONS} sessions of {trials} trials")
+    print(f"compact NBackGame: {compact:8.1f} bytes/session ({compact / trials:5.1f} bytes/trial)")
+    print(f"list-based layout: {legacy:8.1f} bytes/session ({legacy / trials:5.1f} bytes/trial)")
+    print(f"reduction:         {legacy / compact:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Main-thread time to get a playable session: prepared on the spot versus handed over by SessionPrefetcher.
+
+For each session length, "synchronous" is what starting a game used to cost on the UI thread (build the
+game, generate its sequences, decode the sound bank on first use). "prefetched" is the cost of taking a
+session the prefetcher prepared in the background while the menu was showing.
+
+    python -m benchmarks.session_start
+"""
+import time
+
+from app.audio import load_sound_bank
+from app.prefetch import SessionPrefetcher, prepare_session
+
+LENGTHS = (20, 10_000, 1_000_000)
+REPEAT = 20
+
+
+def synchronous(length, bank):
+    start = time.perf_counter()
+    prepare_session(2, sequence_length=length, bank=bank)
+    return time.perf_counter() - start
+
+
+def prefetched(prefetcher):
+    prefetcher.prefetch([(2, False), (3, False), (1, False)])
+    prefetcher._pending[(2, False)].result()  # The menu is showing long enough for the worker to finish
+    start = time.perf_counter()
+    session = prefetcher.take((2, False)).result()
+    elapsed = time.perf_counter() - start
+    assert session.game.get_current_trial_number() == 0
+    return elapsed
+
+
+def main():
+    start = time.perf_counter()
+    bank = load_sound_bank(9)
+    print(f"sound bank decode (first session only): {(time.perf_counter() - start) * 1000:.2f} ms")
+    print(f"{'trials':>10} {'synchronous ms':>15} {'prefetched ms':>14}")
+    for length in LENGTHS:
+        prefetcher = SessionPrefetcher(sequence_length=length)
+        sync_time = min(synchronous(length, bank) for _ in range(REPEAT))
+        prefetch_time = min(prefetched(prefetcher) for _ in range(REPEAT))
+        prefetcher.close()
+        print(f"{length:10d} {sync_time * 1000:15.3f} {prefetch_time * 1000:14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Throughput of simulate_sessions by number of worker processes.
+
+Simulates NUM_SESSIONS sessions of a PlayerModel once per process count and reports sessions per second
+and the speedup over the first count (one process by default), which should grow close to linearly up
+to the number of cores. Every run uses the same seed, so the scores are also checked to be identical
+across process counts.
+
+    python -m benchmarks.simulation_scaling [processes ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from app.simulation import PlayerModel, simulate_sessions
+
+NUM_SESSIONS = 2_000_000
+CHUNK_SIZE = 50_000
+
+
+def process_counts(cores):
+    counts = [1]
+    while counts[-1] * 2 <= cores:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cores:
+        counts.append(cores)
+    return counts
+
+
+def main():
+    cores = os.cpu_count() or 1
+    counts = [int(arg) for arg in sys.argv[1:]] or process_counts(cores)
+    player = PlayerModel()
+    print(f"{NUM_SESSIONS} sessions in chunks of {CHUNK_SIZE}, {cores} cores")
+    print(f"{'processes':>9} {'seconds':>8} {'sessions/s':>11} {'speedup':>8}")
+    reference = single_rate = None
+    for processes in counts:
+        start = time.perf_counter()
+        scores = simulate_sessions(player, NUM_SESSIONS, match_probability=0.3, seed=0, chunk_size=CHUNK_SIZE,
+                                   processes=processes)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = scores
+        assert np.array_equal(scores, reference)
+        rate = NUM_SESSIONS / elapsed
+        single_rate = single_rate or rate
+        print(f"{processes:9d} {elapsed:8.2f} {rate:11.0f} {rate / single_rate:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
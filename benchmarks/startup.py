@@ -0,0 +1,32 @@
+"""Cold-start time to first splash frame and peak RSS.
+
+Each mode starts the app in a fresh interpreter under a hidden window and stops it as soon as the splash
+image has been drawn. "eager" reproduces the previous startup path for comparison: game modules imported
+up front, GameScreen built in build(), full-resolution images and the session log opened in on_start.
+
+    python -m benchmarks.startup [runs]
+"""
+import json
+import os
+import subprocess
+import sys
+
+
+def run(mode):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-m", "benchmarks.startup_probe", mode],
+                            capture_output=True, text=True, cwd=root, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for mode in ("eager", "lazy"):
+        results = [run(mode) for _ in range(runs)]
+        first_frame = sorted(r["first_frame_s"] for r in results)[runs // 2]
+        peak_rss = sorted(r["peak_rss_mib"] for r in results)[runs // 2]
+        print(f"{mode:6s} median of {runs}: first frame {first_frame * 1000:7.1f} ms, peak RSS {peak_rss:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
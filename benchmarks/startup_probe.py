@@ -0,0 +1,58 @@
+"""Child process of benchmarks.startup: runs the app until the splash image is on screen.
+
+    python -m benchmarks.startup_probe eager|lazy
+"""
+import time
+
+start = time.perf_counter()
+
+import json  # noqa: E402
+import os  # noqa: E402
+import resource  # noqa: E402
+import sys  # noqa: E402
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+from kivy.config import Config  # noqa: E402
+
+Config.set("graphics", "window_state", "hidden")
+
+from kivy.core.window import Window  # noqa: E402
+
+import main  # noqa: E402
+
+EAGER = sys.argv[1] == "eager"
+if EAGER:
+    import app.assets
+    from app.game_screen import GameScreen
+
+    # Full-resolution sources, as before the asset build step
+    main.scaled_asset = app.assets.scaled_asset = lambda path, target_px: app.assets.resource_path(path)
+
+
+class Probe(main.NBackApp):
+    def build(self):
+        root = super().build()
+        if EAGER:
+            root.add_widget(GameScreen(name='game_screen'))
+        return root
+
+    def on_start(self):
+        if EAGER:
+            self.open_session_log(0)
+        else:
+            super().on_start()
+        Window.bind(on_flip=self.on_flip)
+
+    def on_flip(self, *args):
+        splash = self.root.get_screen('splash_screen')
+        if getattr(splash, 'splash_image', None) is not None and splash.splash_image.texture is not None:
+            elapsed = time.perf_counter() - start
+            peak_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            print(json.dumps({"first_frame_s": elapsed, "peak_rss_mib": peak_kib / 1024}))
+            self.stop()
+
+
+if __name__ == "__main__":
+    Probe().run()
@@ -0,0 +1,114 @@
+"""Incremental StatsIndex updates versus recomputing statistics from the full history.
+
+Builds a synthetic history of NUM_HISTORY sessions, then records NUM_NEW more sessions and reads back the
+best score, mean and median for the session's N after each one - once through StatsIndex and once by
+rescanning every header, which is what an end-of-game popup would do without the index.
+
+It also writes the history to a real session log and times what app start-up pays for the index: opening
+the log and rebuilding from every record, versus loading the saved index and folding in only the NUM_NEW
+sessions appended after it was saved.
+
+    python -m benchmarks.stats_index
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from app.session_log import HEADER_DTYPE, SessionLogReader, SessionLogWriter, encode_session
+from app.stats import StatsIndex
+
+NUM_HISTORY = 200_000
+NUM_NEW = 200
+
+
+def synthetic_headers(num_sessions, rng):
+    headers = np.zeros(num_sessions, dtype=HEADER_DTYPE)
+    headers["n_value"] = rng.integers(1, 8, num_sessions)
+    headers["max_score"] = 40
+    headers["score"] = rng.binomial(40, 0.75, num_sessions)
+    headers["timestamp"] = np.sort(rng.uniform(1.6e9, 1.7e9, num_sessions))
+    return headers
+
+
+def full_scan(headers, n_value):
+    rows = headers["n_value"] == n_value
+    scores = headers["score"][rows].astype(np.float64)
+    return scores.max(), scores.mean(), np.median(scores / headers["max_score"][rows])
+
+
+def write_log(path, headers, rng):
+    """Appends one two-channel session per header row; returns the size of the log afterwards."""
+    with SessionLogWriter(path, fsync=False) as writer:
+        records = []
+        for row in headers:
+            n_value = int(row["n_value"])
+            sequences = rng.integers(0, 9, (20 + n_value, 2), dtype=np.uint8)
+            records.append(encode_session(n_value, sequences, np.zeros(sequences.shape, dtype=bool),
+                                          int(row["score"]), int(row["max_score"]), float(row["timestamp"])))
+        writer.append_record(b"".join(records))
+        return writer.size
+
+
+def time_startup(history, new, rng):
+    """Returns (open + index, full rebuild, load saved index + fold in new sessions) in seconds."""
+    with tempfile.TemporaryDirectory() as directory:
+        log_path, index_path = os.path.join(directory, "sessions.nbl"), os.path.join(directory, "stats.npz")
+        log_offset = write_log(log_path, history, rng)
+        with SessionLogReader(log_path) as reader:
+            StatsIndex.from_log(reader).save(index_path, log_offset)
+        write_log(log_path, new, rng)
+
+        start = time.perf_counter()
+        reader = SessionLogReader(log_path)
+        indexed = time.perf_counter()
+        StatsIndex.from_log(reader)
+        rebuilt = time.perf_counter()
+        reader.close()
+
+        start_saved = time.perf_counter()
+        index, log_offset = StatsIndex.load(index_path)
+        with SessionLogReader(log_path, start=log_offset) as reader:
+            index.merge(StatsIndex.from_log(reader))
+        folded = time.perf_counter()
+    return indexed - start, rebuilt - start, folded - start_saved
+
+
+def main():
+    rng = np.random.default_rng(0)
+    history = synthetic_headers(NUM_HISTORY, rng)
+    new = synthetic_headers(NUM_NEW, rng)
+
+    start = time.perf_counter()
+    index = StatsIndex.from_headers(history)
+    rebuild = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in new:
+        n_value = int(row["n_value"])
+        index.record(n_value, int(row["score"]), int(row["max_score"]), float(row["timestamp"]))
+        stats = index.by_n[n_value]
+        stats.best(), stats.mean, stats.quantile(0.5)
+    incremental = (time.perf_counter() - start) / NUM_NEW
+
+    headers = np.concatenate([history, new])
+    start = time.perf_counter()
+    for i, row in enumerate(new):
+        full_scan(headers[:NUM_HISTORY + i + 1], int(row["n_value"]))
+    scan = (time.perf_counter() - start) / NUM_NEW
+
+    open_index, full_rebuild, saved = time_startup(history, new, rng)
+
+    print(f"history: {NUM_HISTORY} sessions")
+    print(f"open log + index records:   {open_index * 1e3:9.2f} ms")
+    print(f"start-up, full rebuild:     {full_rebuild * 1e3:9.2f} ms")
+    print(f"start-up, saved index:      {saved * 1e3:9.2f} ms ({NUM_NEW} new sessions)")
+    print(f"bulk rebuild:               {rebuild * 1e3:9.2f} ms")
+    print(f"incremental update + query: {incremental * 1e6:9.2f} us/session")
+    print(f"full scan per session:      {scan * 1e6:9.2f} us/session")
+    print(f"speedup:                    {scan / incremental:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
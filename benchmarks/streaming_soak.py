@@ -0,0 +1,64 @@
+"""Endless-mode soak test: per-trial cost and memory of StreamingNBackGame as sessions get longer.
+
+Plays sessions of increasing length through the same calls the game screen makes per trial (next
+stimuli, score, press events, reaction time) and reports the time per trial and the memory held by the
+session at its end. Both should stay flat; NBackGame sessions of the same length are shown for contrast.
+
+    python -m benchmarks.streaming_soak
+"""
+import random
+import time
+import tracemalloc
+
+from app.core import NBackGame
+from app.events import BUTTON_PRESS, STIMULUS_ONSET, TrialEventBuffer
+from app.streaming import StreamingNBackGame
+
+N_VALUE = 2
+LENGTHS = (20, 2_000, 20_000, 200_000)
+
+
+def play(game, events, rng):
+    game.generate_sequences()
+    events.reset()
+    while not game.is_game_over():
+        game.next_stimuli()
+        trial = game.current_trial_index - 1
+        events.record(STIMULUS_ONSET, trial, timestamp=trial * 2.0)
+        if game.get_current_trial_number() > game.n_value:
+            visual, audio = rng.random() < 0.3, rng.random() < 0.3
+            if visual:
+                events.record(BUTTON_PRESS, trial, 0, trial * 2.0 + 0.4)
+                if isinstance(game, StreamingNBackGame):
+                    game.add_reaction_time(0.4)
+            game.record_response_and_score(visual, audio)
+    return game
+
+
+def measure(build, length):
+    """Returns (microseconds per trial, bytes still held by the finished session)."""
+    events = TrialEventBuffer()
+    start = time.perf_counter()
+    play(build(length), events, random.Random(0))
+    elapsed = time.perf_counter() - start
+
+    # Memory is measured on a second run: tracemalloc slows every allocation down
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    game = play(build(length), events, random.Random(0))
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    game.reaction_times(events)
+    return elapsed / length * 1e6, held
+
+
+def main():
+    print(f"{'trials':>8} {'streaming us/trial':>19} {'bytes held':>11} {'NBackGame us/trial':>19} {'bytes held':>11}")
+    for length in LENGTHS:
+        stream_time, stream_bytes = measure(lambda n: StreamingNBackGame(N_VALUE, seed=1, max_trials=n), length)
+        fixed_time, fixed_bytes = measure(lambda n: NBackGame(N_VALUE, n - N_VALUE, seed=1), length)
+        print(f"{length:8d} {stream_time:19.2f} {stream_bytes:11d} {fixed_time:19.2f} {fixed_bytes:11d}")
+
+
+if __name__ == "__main__":
+    main()
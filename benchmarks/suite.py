@@ -0,0 +1,294 @@
+"""Regression benchmark suite for the core engine and the headless UI hot paths.
+
+Times sequence generation, the per-trial record_response_and_score path, whole-session scoring and the
+memory held per NBackGame session. Under a hidden Kivy window it also drives GameScreen.present_stimulus /
+clear_stimulus through whole sessions, and NBackGrid.highlight_cell on its own, with and without a
+rendered frame after each call. Allocation figures come from tracemalloc.
+
+Every metric is "lower is better". Results are written as JSON and compared against a stored baseline.
+Metrics more than --tolerance worse than the baseline are reported as regressions, and the exit status
+is 1 when there are any. Timings are the best of --repeat runs. Baselines only hold for the machine they
+were recorded on, so record one with --save-baseline before comparing on a new machine; on a noisy machine,
+--runs 5 keeps the median of five whole-suite runs so one unusually fast or slow run does not set the bar.
+
+    python -m benchmarks.suite [--no-ui] [--repeat 5] [--runs 1] [--output benchmarks/results.json]
+                               [--baseline benchmarks/baseline.json] [--tolerance 0.25] [--save-baseline]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.core import NBackGame
+from app.scoring import ScoreSummary, outcome_counts
+from app.sequences import generate_sequence_batch
+from benchmarks.session_memory import play_session
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HERE, "results.json")
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+N_VALUE = 2
+SEQUENCE_LENGTH = 20
+NUM_SESSIONS = 2000
+NUM_BATCH_SESSIONS = 50_000  # Batch paths take microseconds per session, so they need more for stable timings
+NUM_UI_SESSIONS = 50
+NUM_UI_TRIALS = 2000
+FRAME_FRACTION = 10  # Rendered runs cover 1/FRAME_FRACTION of the trials: a frame costs far more than a callback
+
+
+def best_of(repeat, run):
+    """Returns the smallest of repeat results of run(), after one untimed warm-up run.
+
+    The warm-up fills NumPy's and the interpreter's caches, so a single repeat is not a cold-start figure.
+    """
+    run()
+    return min(run() for _ in range(repeat))
+
+
+def per_call(function, count):
+    """Calls function(i) for i in range(count); returns the mean seconds per call."""
+    start = time.perf_counter()
+    for i in range(count):
+        function(i)
+    return (time.perf_counter() - start) / count
+
+
+def traced(function):
+    """Runs function() under tracemalloc; returns (result, peak bytes, bytes still held afterwards)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak - before, current - before
+
+
+def bench_sequence_generation(repeat):
+    def seeded():
+        game = NBackGame(N_VALUE, SEQUENCE_LENGTH, seed=0)
+        return per_call(lambda i: game.generate_sequences(), NUM_SESSIONS)
+
+    def batch():
+        start = time.perf_counter()
+        generate_sequence_batch(NUM_BATCH_SESSIONS, SEQUENCE_LENGTH, N_VALUE, match_probability=0.3, rng=0)
+        return (time.perf_counter() - start) / NUM_BATCH_SESSIONS
+
+    return {"seeded_us_per_session": best_of(repeat, seeded) * 1e6,
+            "batch_us_per_session": best_of(repeat, batch) * 1e6}
+
+
+def bench_record_response(repeat):
+    game = NBackGame(N_VALUE, 100_000, seed=0)
+    game.generate_sequences()
+    presses = np.random.default_rng(0).random((game.sequence_length, 2)) < 0.3
+
+    def run():
+        game.load_sequences(game.stimuli)
+        start = time.perf_counter()
+        while not game.is_game_over():
+            game.next_stimuli()
+            game.record_response_and_score(*presses[game.current_trial_index - 1])
+        return (time.perf_counter() - start) / game.sequence_length
+
+    return {"us_per_trial": best_of(repeat, run) * 1e6}
+
+
+def bench_session_scoring(repeat):
+    sequences = generate_sequence_batch(NUM_BATCH_SESSIONS, SEQUENCE_LENGTH, N_VALUE, match_probability=0.3, rng=0)
+    responses = np.random.default_rng(1).random(sequences.shape) < 0.3
+
+    def single():
+        return per_call(lambda i: ScoreSummary(outcome_counts(sequences[i], responses[i], N_VALUE)).d_prime,
+                        NUM_SESSIONS)
+
+    def batch():
+        start = time.perf_counter()
+        ScoreSummary(outcome_counts(sequences, responses, N_VALUE)).d_prime
+        return (time.perf_counter() - start) / NUM_BATCH_SESSIONS
+
+    return {"single_us_per_session": best_of(repeat, single) * 1e6,
+            "batch_us_per_session": best_of(repeat, batch) * 1e6}
+
+
+def bench_session_memory(repeat):
+    rng = random.Random(0)
+    _, _, held = traced(lambda: [play_session(rng) for _ in range(NUM_SESSIONS)])
+    return {"bytes_per_session": held / NUM_SESSIONS}
+
+
+def _init_headless_kivy():
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+    from kivy.config import Config
+
+    Config.set("graphics", "window_state", "hidden")
+    Config.set("graphics", "maxfps", "0")  # Rendered frames must not wait for vsync or the frame limiter
+    from kivy.base import EventLoop
+    from kivy.core.window import Window
+
+    EventLoop.ensure_window()
+    return EventLoop, Window
+
+
+def bench_game_screen(repeat):
+    event_loop, window = _init_headless_kivy()
+    from app.audio import AudioStimulusEngine, NullAudioBackend
+    from app.game_screen import GameScreen
+
+    screen = GameScreen(name="game_screen", size=window.size)
+    window.add_widget(screen)
+    screen.audio_engine = AudioStimulusEngine(NullAudioBackend())
+    rng = random.Random(0)
+
+    def play(render):
+        """Plays sessions through the screen callbacks; returns seconds per trial."""
+        elapsed = 0.0
+        trials = 0
+        for session in range(NUM_UI_SESSIONS // FRAME_FRACTION if render else NUM_UI_SESSIONS):
+            screen.set_n_value(N_VALUE)
+            screen.game.seed = session
+            screen.game.generate_sequences()
+            screen.trial_events.reset()
+            screen.audio_engine.prepare(screen.game.num_audio_stimuli, screen.game.sequence_length)
+            screen.game_in_progress = True
+            # The final onset would end the game and open the score popup, which is not a per-trial cost
+            while screen.game.current_trial_index < screen.game.sequence_length:
+                start = time.perf_counter()
+                screen.present_stimulus(0)
+                if rng.random() < 0.3:
+                    screen.on_visual_match(screen.visual_match_button)
+                if render:
+                    event_loop.idle()
+                screen.clear_stimulus(0)
+                if render:
+                    event_loop.idle()
+                elapsed += time.perf_counter() - start
+                trials += 1
+        screen.game_in_progress = False
+        return elapsed / trials
+
+    play(True)  # Warm-up: label textures and font caches
+    trials = NUM_UI_SESSIONS * (SEQUENCE_LENGTH + N_VALUE)
+    _, peak, held = traced(lambda: play(False))
+    results = {"callbacks_us_per_trial": best_of(repeat, lambda: play(False)) * 1e6,
+               "frames_us_per_trial": best_of(repeat, lambda: play(True)) * 1e6,
+               "peak_bytes": peak, "held_bytes_per_trial": max(held, 0) / trials}
+    window.remove_widget(screen)
+    return results
+
+
+def bench_grid_highlight(repeat):
+    event_loop, window = _init_headless_kivy()
+    from app.game_screen import NBackGrid
+
+    grid = NBackGrid(size=window.size)
+    window.add_widget(grid)
+    rng = random.Random(0)
+    indices = [rng.randrange(len(grid.cells)) for _ in range(NUM_UI_TRIALS)]
+
+    def churn(render):
+        """Presents and clears one stimulus per trial; returns seconds per trial."""
+        def trial(i):
+            grid.highlight_cell(indices[i])
+            if render:
+                event_loop.idle()
+            grid.clear_highlight()
+            if render:
+                event_loop.idle()
+        return per_call(trial, NUM_UI_TRIALS // FRAME_FRACTION if render else NUM_UI_TRIALS)
+
+    churn(True)
+    _, peak, held = traced(lambda: churn(False))
+    results = {"callbacks_us_per_trial": best_of(repeat, lambda: churn(False)) * 1e6,
+               "frames_us_per_trial": best_of(repeat, lambda: churn(True)) * 1e6,
+               "peak_bytes": peak, "held_bytes_per_trial": max(held, 0) / NUM_UI_TRIALS}
+    window.remove_widget(grid)
+    return results
+
+
+CORE_BENCHMARKS = {
+    "sequence_generation": bench_sequence_generation,
+    "record_response": bench_record_response,
+    "session_scoring": bench_session_scoring,
+    "session_memory": bench_session_memory,
+}
+UI_BENCHMARKS = {
+    "game_screen": bench_game_screen,
+    "grid_highlight": bench_grid_highlight,
+}
+
+
+def run_suite(repeat, ui=True, runs=1):
+    """Runs every benchmark runs times, interleaved, and keeps the median of each metric."""
+    benchmarks = dict(CORE_BENCHMARKS, **(UI_BENCHMARKS if ui else {}))
+    samples = {name: [] for name in benchmarks}
+    for _ in range(runs):
+        for name, bench in benchmarks.items():
+            samples[name].append(bench(repeat))
+    results = {}
+    for name, runs_of_bench in samples.items():
+        results[name] = {metric: round(float(np.median([run[metric] for run in runs_of_bench])), 3)
+                         for metric in runs_of_bench[0]}
+        print(f"{name}: " + ", ".join(f"{metric} {value:g}" for metric, value in results[name].items()))
+    return {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "platform": platform.platform(), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+
+
+def compare(report, baseline, tolerance):
+    """Prints current / baseline per metric; returns the metrics worse than the baseline by over tolerance."""
+    regressions = []
+    for name, metrics in report["results"].items():
+        for metric, value in metrics.items():
+            reference = baseline["results"].get(name, {}).get(metric)
+            if reference is None:
+                continue
+            ratio = value / reference if reference else (1.0 if value == reference else float("inf"))
+            flag = ""
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name}.{metric}")
+                flag = "  REGRESSION"
+            print(f"{name + '.' + metric:45s} {reference:12g} -> {value:12g}  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=1,
+                        help="run the whole suite this many times and keep each metric's median")
+    parser.add_argument("--no-ui", action="store_true", help="skip the benchmarks that need a Kivy window")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true", help="also store the results as the baseline")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.repeat, ui=not args.no_ui, runs=args.runs)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Cost of the tracing hooks: traced hot paths before enable(), while enabled and after disable().
+
+Plays a long NBackGame through next_stimuli / record_response_and_score and churns NBackGrid highlights
+under a hidden Kivy window. Each traced call records one span, so the enabled column minus the disabled
+one is the price of a span.
+
+    python -m benchmarks.tracing_overhead
+"""
+import os
+import random
+import time
+
+import numpy as np
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+from kivy.config import Config  # noqa: E402
+
+Config.set("graphics", "window_state", "hidden")
+
+from app import tracing  # noqa: E402
+from app.core import NBackGame  # noqa: E402
+from app.game_screen import NBackGrid  # noqa: E402
+
+NUM_TRIALS = 100_000
+NUM_HIGHLIGHTS = 20_000
+REPEAT = 5
+
+
+def game_loop(game, presses):
+    game.load_sequences(game.stimuli)
+    start = time.perf_counter()
+    while not game.is_game_over():
+        game.next_stimuli()
+        game.record_response_and_score(*presses[game.current_trial_index - 1])
+    return (time.perf_counter() - start) / game.sequence_length
+
+
+def highlight_loop(grid, indices):
+    start = time.perf_counter()
+    for index in indices:
+        grid.highlight_cell(index)
+        grid.clear_highlight()
+    return (time.perf_counter() - start) / len(indices)
+
+
+def main():
+    game = NBackGame(2, NUM_TRIALS, seed=0)
+    game.generate_sequences()
+    presses = np.random.default_rng(0).random((game.sequence_length, 2)) < 0.3
+    grid = NBackGrid(size=(600, 600))
+    rng = random.Random(0)
+    indices = [rng.randrange(9) for _ in range(NUM_HIGHLIGHTS)]
+
+    def measure():
+        return (min(game_loop(game, presses) for _ in range(REPEAT)),
+                min(highlight_loop(grid, indices) for _ in range(REPEAT)))
+
+    untraced = measure()
+    tracer = tracing.enable(capacity=1 << 20)
+    enabled = measure()
+    spans = tracer.count
+    tracing.disable()
+    disabled = measure()
+
+    print(f"{'':28s} {'never enabled':>14s} {'enabled':>10s} {'disabled':>10s}")
+    for index, name in enumerate(("trial (3 spans)", "highlight + clear (3 spans)")):
+        print(f"{name:28s} {untraced[index] * 1e6:11.2f} us {enabled[index] * 1e6:7.2f} us "
+              f"{disabled[index] * 1e6:7.2f} us")
+    print(f"{spans} spans recorded while enabled")
+
+
+if __name__ == "__main__":
+    main()
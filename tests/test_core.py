@@ -0,0 +1,37 @@
+import numpy as np
+
+from app.core import NBackGame
+
+
+def test_history_has_one_entry_per_recorded_response():
+    game = NBackGame(n_value=2, sequence_length=8, seed=1)
+    game.generate_sequences()
+    calls = []
+    while not game.is_game_over():
+        game.next_stimuli()
+        if game.get_current_trial_number() > game.n_value:  # As the game screen does
+            calls.append((game.current_trial_index % 2 == 0, game.current_trial_index % 3 == 0))
+            game.record_response_and_score(*calls[-1])
+    assert game.user_visual_responses_history == [visual for visual, _ in calls]
+    assert game.user_audio_responses_history == [audio for _, audio in calls]
+    # The masks and packed views stay aligned with the trials, one row per channel
+    assert game.response_masks().shape == (2, game.sequence_length)
+    assert not game.response_masks()[:, :game.n_value].any()
+    assert len(game.packed_response_views()) == 2
+    unpacked = np.unpackbits(np.stack(game.packed_response_views()), axis=1, count=game.sequence_length,
+                             bitorder='little')
+    assert np.array_equal(unpacked, game.response_masks())
+
+
+def test_history_after_restart():
+    game = NBackGame(n_value=1, sequence_length=4, seed=2)
+    game.generate_sequences()
+    game.next_stimuli()
+    game.record_response_and_score(True, True)  # Observe-only trial, still recorded
+    game.generate_sequences()
+    assert game.user_visual_responses_history == []
+    game.next_stimuli()
+    game.next_stimuli()
+    game.record_response_and_score(False, True)
+    assert game.user_visual_responses_history == [False]
+    assert game.user_audio_responses_history == [True]
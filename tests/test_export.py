@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from app.core import MultiNBackGame, NBackGame
+from app.export import NOT_SCORED, export_sessions, load_columns
+from app.session_log import FLAG_SEEDED, SessionLogReader, SessionLogWriter, encode_game
+
+
+def play(game, rng):
+    presses = rng.random((game.sequence_length, game.num_channels)) < 0.3
+    while not game.is_game_over():
+        game.next_stimuli()
+        if game.get_current_trial_number() > game.n_value:
+            game.record_responses(presses[game.current_trial_index - 1])
+    first_press = np.where(game.response_masks().T, rng.uniform(0.2, 1.5, presses.shape), np.nan)
+    return game, first_press
+
+
+@pytest.fixture
+def played():
+    """Sessions of mixed N and channel counts, every third one logged without reaction times; the last one
+    has loaded stimuli."""
+    rng = np.random.default_rng(0)
+    games = [NBackGame(n_value=int(rng.integers(1, 5)), sequence_length=20, seed=seed) for seed in range(40)]
+    games += [MultiNBackGame(3, 30, (256, 2, 7), seed=2**32 - 1), MultiNBackGame(1, 5, (4,), seed=7)]
+    for game in games:
+        game.generate_sequences()
+    games[-1].load_sequences(games[-1].stimuli[::-1])  # No longer follows from its seed
+    sessions = [play(game, rng) for game in games]
+    return [(game, None if index % 3 == 0 else first_press) for index, (game, first_press) in enumerate(sessions)]
+
+
+@pytest.fixture
+def log_path(tmp_path, played):
+    path = str(tmp_path / "sessions.log")
+    with SessionLogWriter(path, fsync=False) as writer:
+        for game, first_press in played:
+            writer.append_game(game, timestamp=1.0, first_press=first_press)
+    return path
+
+
+def test_reader_round_trip(log_path, played):
+    with SessionLogReader(log_path) as reader:
+        assert len(reader) == len(played)
+        # Sessions generated from their seed are logged as the seed; the loaded one keeps its stimuli
+        assert (reader.headers()["flags"] & FLAG_SEEDED > 0).tolist() == [game.seed is not None for game, _ in played]
+        for index, (game, first_press) in enumerate(played):
+            header, sequences, responses = reader[index]
+            assert np.array_equal(sequences, game.stimuli)
+            assert np.array_equal(responses[:game.current_trial_index].T, game.response_masks())
+            rts = reader.reaction_times(index)
+            if first_press is None:
+                assert rts is None
+            else:
+                assert np.allclose(rts, first_press, atol=5e-4, equal_nan=True)
+
+
+def test_export_matches_log(tmp_path, log_path, played):
+    directory = str(tmp_path / "export")
+    export_sessions(log_path, directory, batch_size=16, file_format="npz")
+    sessions, trials = load_columns(directory, "sessions"), load_columns(directory)
+    assert np.array_equal(sessions["score"], [game.get_score() for game, _ in played])
+    for index, (game, first_press) in enumerate(played):
+        rows = slice(sessions["first_row"][index], sessions["first_row"][index] + game.stimuli.size)
+        assert (trials["session"][rows] == index).all()
+        assert np.array_equal(trials["stimulus"][rows], game.stimuli.ravel())
+        expected = np.full(game.stimuli.shape, np.nan) if first_press is None else np.round(first_press, 3)
+        assert np.allclose(trials["reaction_time"][rows], expected.ravel(), atol=1e-6, equal_nan=True)
+        scored = trials["outcome"][rows] != NOT_SCORED
+        assert trials["correct"][rows][scored].sum() == game.get_score()
+
+
+def test_seeded_records_are_smaller(played):
+    game, first_press = played[1]
+    seeded = encode_game(game, 0, first_press)
+    seed, game.seed = game.seed, None
+    try:
+        assert len(seeded) == len(encode_game(game, 0, first_press)) - game.stimuli.size + 4 + 2 * game.num_channels
+    finally:
+        game.seed = seed
+
+
+def test_export_empty_log(tmp_path, played):
+    log_path, directory = str(tmp_path / "sessions.log"), str(tmp_path / "export")
+    with SessionLogWriter(log_path, fsync=False) as writer:
+        manifest = export_sessions(log_path, directory, file_format="npz")
+        assert manifest["sessions"] == 0 and manifest["chunks"] == []
+        sessions, trials = load_columns(directory, "sessions"), load_columns(directory)
+        assert len(sessions["score"]) == 0 and len(trials["session"]) == 0
+
+        game, first_press = played[1]
+        writer.append_game(game, timestamp=1.0, first_press=first_press)
+    export_sessions(log_path, directory)  # Continues the empty export in its format
+    assert load_columns(directory, "sessions")["score"].tolist() == [game.get_score()]
@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from app.audio import NullAudioBackend
+from app.prefetch import SessionPrefetcher
+
+
+class RecordingBackend(NullAudioBackend):
+    def __init__(self):
+        super().__init__()
+        self.loads = []
+
+    def load(self, bank, sample_rate):
+        super().load(bank, sample_rate)
+        self.loads.append((bank, threading.current_thread()))
+
+
+def test_sounds_are_loaded_on_the_worker():
+    backend = RecordingBackend()
+    prefetcher = SessionPrefetcher(audio_backend=backend)
+    try:
+        prefetcher.prefetch([(2, False)])
+        prepared = prefetcher.take((2, False)).result(timeout=10)
+        assert backend.loads and all(thread is not threading.main_thread() for _, thread in backend.loads)
+        assert backend.loads[0][0] is prepared.bank  # The bank the engine is then prepared with
+    finally:
+        prefetcher.close()
+
+
+def test_failure_is_raised_from_the_future():
+    class FailingBackend(NullAudioBackend):
+        def load(self, bank, sample_rate):
+            raise OSError("no audio device")
+
+    prefetcher = SessionPrefetcher(audio_backend=FailingBackend())
+    try:
+        with pytest.raises(OSError, match="no audio device"):
+            prefetcher.take((2, False)).result(timeout=10)
+    finally:
+        prefetcher.close()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from app.core import MultiNBackGame, NBackGame
+from app.replay import Replay, encode_replay, rescore_replays
+from app.scoring import ScoreSummary
+from app.session_log import encode_game
+
+
+def play(game, rng):
+    game.generate_sequences()
+    presses = rng.random((game.sequence_length, game.num_channels)) < 0.3
+    while not game.is_game_over():
+        game.next_stimuli()
+        if game.get_current_trial_number() > game.n_value:
+            game.record_responses(presses[game.current_trial_index - 1])
+    first_press = np.where(game.response_masks().T, rng.uniform(0.2, 1.5, presses.shape), np.nan)
+    return game, first_press
+
+
+@pytest.fixture
+def played():
+    rng = np.random.default_rng(0)
+    games = [NBackGame(n_value=int(rng.integers(1, 8)), sequence_length=20, seed=seed) for seed in range(50)]
+    games += [MultiNBackGame(3, 30, (256, 2, 7), seed=2**32 - 1), MultiNBackGame(1, 5, (4,), seed=7)]
+    return [play(game, rng) for game in games]
+
+
+def test_round_trip(played):
+    for game, first_press in played:
+        replay = Replay(encode_replay(game, first_press))
+        assert np.array_equal(replay.sequences(), game.stimuli)
+        assert np.array_equal(replay.responses.T, game.response_masks())
+        assert np.allclose(replay.reaction_times, first_press, atol=5e-4, equal_nan=True)
+        assert replay.score_summary().score == game.get_score()
+        assert replay.game().get_score() == game.get_score()
+
+
+def test_rescore(played):
+    dual = [(game, first_press) for game, first_press in played if game.num_channels == 2]
+    counts = rescore_replays([encode_replay(game) for game, _ in dual])
+    assert (ScoreSummary(counts).score == [game.get_score() for game, _ in dual]).all()
+    with pytest.raises(ValueError):
+        rescore_replays([encode_replay(game) for game, _ in played[-2:]])
+
+
+@pytest.mark.parametrize("seed", [-1, 2**32, 1.5, "1"])
+def test_invalid_seed(seed):
+    with pytest.raises(ValueError):
+        MultiNBackGame(seed=seed)
+
+
+def test_loaded_sequences_are_not_replayable():
+    game = NBackGame(seed=3)
+    game.load_sequences(np.zeros((22, 2), dtype=np.uint8))
+    assert game.seed is None
+    with pytest.raises(ValueError):
+        encode_replay(game)
+    assert encode_game(game, 0)  # Logged with its stimuli instead
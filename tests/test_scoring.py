@@ -0,0 +1,67 @@
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+from app.scoring import (CORRECT_REJECTION, FALSE_ALARM, HIT, MISS, ScoreSummary, norm_ppf, outcome_codes,
+                         score_sessions)
+
+
+def test_norm_ppf_matches_statistics():
+    p = np.concatenate([np.linspace(1e-12, 1e-3, 500), np.linspace(1e-3, 1 - 1e-3, 5000),
+                        np.linspace(1 - 1e-3, 1 - 1e-12, 500), [0.02425, 0.5, 0.97575]])
+    expected = np.array([NormalDist().inv_cdf(x) for x in p])
+    error = np.abs(norm_ppf(p) - expected)
+    assert (error <= 1.2e-9 * np.abs(expected)).all()  # Acklam's relative error bound
+    assert error[(p > 1e-6) & (p < 1 - 1e-6)].max() < 5e-9
+    assert norm_ppf(0.5) == 0.0
+    assert np.allclose(norm_ppf(p), -norm_ppf(1 - p), atol=1e-9)
+
+
+def test_outcome_codes():
+    actual_match = np.array([True, True, False, False])
+    pressed = np.array([True, False, True, False])
+    assert outcome_codes(actual_match, pressed).tolist() == [HIT, MISS, FALSE_ALARM, CORRECT_REJECTION]
+
+
+def test_hand_built_session():
+    # N = 1. Channel 0 matches on trials 1 and 3; channel 1 on trials 2 and 5
+    sequences = np.array([[1, 4], [1, 5], [2, 5], [2, 6], [3, 7], [1, 7]])
+    responses = np.array([[True, True],  # Ignored: nothing to compare the first trial with
+                          [True, False],  # Hit, correct rejection
+                          [True, True],  # False alarm, hit
+                          [False, False],  # Miss, correct rejection
+                          [False, False],  # Correct rejection x 2
+                          [False, True]])  # Correct rejection, hit
+    summary = score_sessions(sequences, responses, 1)
+    assert summary.counts.tolist() == [[1, 1, 2, 1], [2, 0, 3, 0]]  # HIT, MISS, CR, FA per channel
+    assert summary.score == 8
+    hit_rate = np.array([1.5 / 3, 2.5 / 3])
+    false_alarm_rate = np.array([1.5 / 4, 0.5 / 4])
+    assert summary.hit_rate == pytest.approx(hit_rate)
+    assert summary.false_alarm_rate == pytest.approx(false_alarm_rate)
+    inv_cdf = np.vectorize(NormalDist().inv_cdf)
+    assert summary.d_prime == pytest.approx(inv_cdf(hit_rate) - inv_cdf(false_alarm_rate), abs=1e-8)
+    assert summary.criterion == pytest.approx(-0.5 * (inv_cdf(hit_rate) + inv_cdf(false_alarm_rate)), abs=1e-8)
+
+
+def test_perfect_and_empty_rates_stay_finite():
+    # Perfect: 5 hits, 15 correct rejections; worst: 5 misses, 15 false alarms; empty: nothing scored
+    summary = ScoreSummary([[5, 0, 15, 0], [0, 5, 0, 15], [0, 0, 0, 0]])
+    assert summary.hit_rate.tolist() == [5.5 / 6, 0.5 / 6, 0.5]
+    assert summary.false_alarm_rate.tolist() == [0.5 / 16, 15.5 / 16, 0.5]
+    assert np.isfinite(summary.d_prime).all()
+    assert summary.d_prime[0] == pytest.approx(NormalDist().inv_cdf(5.5 / 6) - NormalDist().inv_cdf(0.5 / 16))
+    assert summary.d_prime[1] == pytest.approx(-summary.d_prime[0])
+    assert summary.d_prime[2] == 0.0
+
+
+def test_stacked_sessions_match_single_sessions():
+    rng = np.random.default_rng(0)
+    sequences = rng.integers(0, 3, (50, 22, 2))
+    responses = rng.random(sequences.shape) < 0.4
+    stacked = score_sessions(sequences, responses, 2)
+    for index in range(len(sequences)):
+        single = score_sessions(sequences[index], responses[index], 2)
+        assert np.array_equal(stacked.counts[index], single.counts)
+        assert np.allclose(stacked.d_prime[index], single.d_prime)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from app.sequences import generate_sequence_batch, match_rates
+
+
+def match_counts(batch, n_value):
+    return (batch[:, n_value:] == batch[:, :-n_value]).sum(axis=1)
+
+
+@pytest.mark.parametrize("n_value", [1, 2, 3, 9])
+def test_exact_match_count(n_value):
+    batch = generate_sequence_batch(500, 20, n_value, (9, 4), match_probability=(0.3, 0.25), rng=1)
+    assert batch.shape == (500, 20 + n_value, 2)
+    counts = match_counts(batch, n_value)
+    assert (counts[:, 0] == 6).all()
+    assert (counts[:, 1] == 5).all()
+
+
+def test_mean_match_rate():
+    batch = generate_sequence_batch(20_000, 20, 2, (9, 9), match_probability=(0.3, 0.1), exact=False, rng=2)
+    rates = match_rates(batch, 2).mean(axis=0)
+    assert rates == pytest.approx([0.3, 0.1], abs=0.005)
+    assert len(np.unique(match_counts(batch, 2)[:, 0])) > 1  # Counts vary between sessions
+
+
+def test_uniform_draw_rate():
+    batch = generate_sequence_batch(20_000, 20, 3, 8, rng=3)
+    assert match_rates(batch, 3).mean() == pytest.approx(1 / 8, abs=0.005)
+
+
+@pytest.mark.parametrize("match_probability", [None, 0.3])
+def test_value_range(match_probability):
+    num_options = (9, 2, 256, 1) if match_probability is None else (9, 2, 256)
+    batch = generate_sequence_batch(2000, 30, 2, num_options, match_probability=match_probability, rng=4)
+    assert batch.dtype == np.uint8
+    for channel, options in enumerate(num_options):
+        values = np.unique(batch[:, :, channel])
+        assert values.tolist() == list(range(options))
+
+
+def test_reproducible_from_seed():
+    first = generate_sequence_batch(100, 20, 2, (9, 9), match_probability=0.3, rng=5)
+    assert np.array_equal(first, generate_sequence_batch(100, 20, 2, (9, 9), match_probability=0.3, rng=5))
+    assert not np.array_equal(first, generate_sequence_batch(100, 20, 2, (9, 9), match_probability=0.3, rng=6))
+
+
+@pytest.mark.parametrize("kwargs", [{"n_value": 0}, {"match_probability": 1.5}, {"num_options": 300},
+                                    {"num_options": (9, 1), "match_probability": 0.3},
+                                    {"match_probability": (0.3, 0.3, 0.3)}])
+def test_invalid_arguments(kwargs):
+    with pytest.raises(ValueError):
+        generate_sequence_batch(**{"num_sessions": 1, "sequence_length": 20, "n_value": 2, **kwargs})
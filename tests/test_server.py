@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pytest
+
+from app.server import GameServer
+
+
+async def exchange_on(reader, writer, *messages):
+    """Sends messages on an open connection and returns the first reply to each."""
+    replies = []
+    for message in messages:
+        writer.write(json.dumps(message).encode() + b"\n")
+        replies.append(json.loads(await reader.readline()))
+    return replies
+
+
+async def exchange(port, *messages):
+    """Sends messages on one connection and returns the first reply to each."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    replies = await exchange_on(reader, writer, *messages)
+    writer.close()
+    await writer.wait_closed()
+    return replies
+
+
+def run_server(client):
+    async def main():
+        server = GameServer(stimulus_duration=0.01, inter_stimulus_interval=0.01, lead_in=1.0)
+        listener = await asyncio.start_server(server.handle_client, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            return server, await client(port)
+        finally:
+            listener.close()
+            await listener.wait_closed()
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("start", [
+    {"seed": -1}, {"seed": 2**64}, {"seed": 2**32}, {"seed": 1.5}, {"seed": "7"}, {"seed": True},
+    {"channels": "99"}, {"channels": [9, "9"]}, {"channels": [9.0]}, {"channels": 9}, {"n": "2"}, {"trials": 2.5},
+])
+def test_invalid_start_is_rejected_without_leaking(start):
+    async def client(port):
+        replies = await exchange(port, {"op": "start", **start}, {"op": "stats"})
+        await asyncio.sleep(0.05)  # Let the server see the connection close
+        return replies
+
+    server, (reply, stats) = run_server(client)
+    assert reply["event"] == "error"
+    assert stats["sessions"] == 0 and stats["sessions_started"] == 0
+    assert server.sessions == {}
+
+
+def test_session_is_registered_once_started():
+    async def client(port):
+        replies = await exchange(port, {"op": "start", "n": 1, "trials": 2, "seed": 2**32 - 1}, {"op": "stats"})
+        await asyncio.sleep(0.05)
+        return replies
+
+    server, (started, stats) = run_server(client)
+    assert started["event"] == "started" and started["seed"] == 2**32 - 1
+    assert stats["sessions"] == 1
+    assert server.sessions == {}  # Closed with its connection
+
+
+@pytest.mark.parametrize("size", [1 << 16, 1 << 20])
+def test_overlong_line_is_answered_with_an_error(size):
+    async def client(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b'{"op": "stats", "padding": "' + b"x" * size + b'"}\n')
+        replies = [json.loads(await reader.readline())]
+        replies += await exchange_on(reader, writer, {"op": "stats"})
+        writer.close()
+        await writer.wait_closed()
+        return replies
+
+    server, (error, stats) = run_server(client)
+    assert error == {"event": "error", "message": "Message too long."}
+    assert stats["event"] == "stats"  # The connection carries on with the next message
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.core import NBackGame
+from app.session_log import FILE_HEADER, SessionLogReader, SessionLogWriter
+
+
+def play(seed):
+    game = NBackGame(n_value=2, sequence_length=20, seed=seed)
+    game.generate_sequences()
+    while not game.is_game_over():
+        game.next_stimuli()
+        if game.get_current_trial_number() > game.n_value:
+            game.record_response_and_score(game.current_trial_index % 3 == 0, game.current_trial_index % 2 == 0)
+    return game
+
+
+@pytest.fixture
+def log_bytes(tmp_path):
+    """A log holding one record without reaction times and one with them."""
+    path = tmp_path / "full.log"
+    games = [play(1), play(2)]
+    first_press = np.where(games[1].response_masks().T, 0.5, np.nan)
+    with SessionLogWriter(str(path), fsync=False) as writer:
+        writer.append_game(games[0], timestamp=1.0)
+        ends = [os.path.getsize(path)]
+        writer.append_game(games[1], timestamp=2.0, first_press=first_press)
+        ends.append(os.path.getsize(path))
+    return path.read_bytes(), ends
+
+
+def test_reopen_after_truncation_at_every_offset(tmp_path, log_bytes):
+    data, ends = log_bytes
+    path = str(tmp_path / "torn.log")
+    for cut in range(len(data) + 1):
+        with open(path, "wb") as f:
+            f.write(data[:cut])
+        with SessionLogWriter(path, fsync=False) as writer:
+            writer.append_game(play(3), timestamp=3.0)
+        intact = sum(end <= cut for end in ends)
+        with SessionLogReader(path) as reader:
+            assert len(reader) == intact + 1, cut
+            assert reader.headers()["timestamp"].tolist() == [1.0, 2.0][:intact] + [3.0]
+            if intact == 2:
+                assert np.nanmax(reader.reaction_times(1)) == 0.5
+
+
+@pytest.mark.parametrize("size", [0, 1, FILE_HEADER.size - 1])
+def test_reader_rejects_short_file(tmp_path, size):
+    path = tmp_path / "short.log"
+    path.write_bytes(b"N" * size)
+    with pytest.raises(ValueError):
+        SessionLogReader(str(path))
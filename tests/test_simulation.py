@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from app.simulation import PlayerModel, simulate_sessions
+
+
+def test_same_results_for_any_process_count():
+    player = PlayerModel(hit_rate=0.7, false_alarm_rate=0.15)
+    kwargs = dict(n_value=3, match_probability=0.3, seed=42, chunk_size=700)
+    single = simulate_sessions(player, 5000, processes=1, **kwargs)
+    assert single.shape == (5000,) and single.dtype == np.int32
+    assert np.array_equal(single, simulate_sessions(player, 5000, processes=2, **kwargs))
+    assert not np.array_equal(single, simulate_sessions(player, 5000, processes=1, **{**kwargs, "seed": 43}))
+
+
+def test_scores_follow_the_player():
+    perfect = simulate_sessions(PlayerModel(1.0, 0.0, 0.0, 1.0), 1000, sequence_length=20, seed=1, processes=1)
+    assert (perfect == 40).all()  # Every scored trial correct on both channels
+    noisy = simulate_sessions(PlayerModel(0.5, 0.5, 0.0, 1.0), 1000, sequence_length=20, seed=1, processes=1)
+    assert noisy.mean() == pytest.approx(20, abs=1)  # Coin flips on 40 scored responses
+
+
+def test_empty_and_invalid():
+    assert simulate_sessions(PlayerModel(), 0).shape == (0,)
+    with pytest.raises(ValueError):
+        simulate_sessions(PlayerModel(), 10, chunk_size=0)
+    with pytest.raises(ValueError):
+        PlayerModel(hit_rate=1.5)
@@ -0,0 +1,81 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.session_log import HEADER_DTYPE, SessionLogReader, SessionLogWriter, encode_session
+from app.stats import StatsIndex, day_key
+
+
+@pytest.fixture
+def berlin(monkeypatch):
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset() is not available")
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_day_key_follows_dst(berlin):
+    # Just after local midnight in winter (UTC+1) and in summer (UTC+2)
+    timestamps = [datetime(2024, 1, 15, 0, 30).timestamp(), datetime(2024, 7, 15, 0, 30).timestamp()]
+    expected = [datetime(2024, 1, 15).toordinal(), datetime(2024, 7, 15).toordinal()]
+    epoch = datetime(1970, 1, 1).toordinal()
+    assert day_key(np.array(timestamps)).tolist() == [day - epoch for day in expected]
+    assert [int(day_key(timestamp)) for timestamp in timestamps] == [day - epoch for day in expected]
+
+
+def assert_same_index(index, expected):
+    for groups, expected_groups in [({0: index.overall}, {0: expected.overall}), (index.by_n, expected.by_n),
+                                    (index.by_day, expected.by_day)]:
+        assert groups.keys() == expected_groups.keys()
+        for key, stats in groups.items():
+            other = expected_groups[key]
+            assert stats.count == other.count
+            assert stats.mean == pytest.approx(other.mean) and stats.variance == pytest.approx(other.variance)
+            assert np.array_equal(stats.histogram, other.histogram)
+            assert stats.top() == other.top()
+
+
+def random_headers(num_sessions, rng):
+    headers = np.zeros(num_sessions, dtype=HEADER_DTYPE)
+    headers["n_value"] = rng.integers(1, 5, num_sessions)
+    headers["max_score"] = 40
+    headers["score"] = rng.integers(0, 41, num_sessions)
+    headers["timestamp"] = rng.uniform(1.6e9, 1.6e9 + 30 * 86400, num_sessions).round()
+    return headers
+
+
+def test_merge_matches_rebuild():
+    headers = random_headers(1000, np.random.default_rng(0))
+    index = StatsIndex.from_headers(headers[:700])
+    index.merge(StatsIndex.from_headers(headers[700:]))
+    assert_same_index(index, StatsIndex.from_headers(headers))
+
+
+def test_saved_index_folds_in_newer_sessions(tmp_path):
+    rng = np.random.default_rng(1)
+    log_path, index_path = str(tmp_path / "sessions.nbl"), str(tmp_path / "stats.npz")
+    headers = random_headers(60, rng)
+    records = [encode_session(int(row["n_value"]), rng.integers(0, 9, (22, 2), dtype=np.uint8),
+                              np.zeros((22, 2), dtype=bool), int(row["score"]), 40, float(row["timestamp"]))
+               for row in headers]
+    with SessionLogWriter(log_path, fsync=False) as writer:
+        for record in records[:40]:
+            writer.append_record(record)
+        with SessionLogReader(log_path) as reader:
+            StatsIndex.from_log(reader).save(index_path, writer.size)
+        for record in records[40:]:
+            writer.append_record(record)
+
+    index, log_offset = StatsIndex.load(index_path)
+    with SessionLogReader(log_path, start=log_offset) as reader:
+        assert len(reader) == 20
+        index.merge(StatsIndex.from_log(reader))
+    assert_same_index(index, StatsIndex.from_headers(headers))
+
+    with pytest.raises(ValueError):
+        SessionLogReader(log_path, start=log_offset + 1)  # Not a record boundary
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from app.core import MultiNBackGame, NBackGame
+from app.streaming import StreamingMultiNBackGame, StreamingNBackGame
+
+
+@pytest.mark.parametrize("num_options", [(9, 9), (256, 2, 7), (4,)])
+def test_matches_multi_game(num_options):
+    rng = np.random.default_rng(0)
+    game = MultiNBackGame(3, 40, num_options, seed=11)
+    game.generate_sequences()
+    stream = StreamingMultiNBackGame(3, num_options, seed=11, max_trials=game.sequence_length, accuracy_window=5)
+    while not game.is_game_over():
+        assert stream.next_stimuli() == game.next_stimuli()
+        pressed = rng.random(len(num_options)) < 0.4
+        game.record_responses(pressed)
+        stream.record_responses(pressed)
+    assert stream.is_game_over()
+    assert stream.next_stimuli() == (None,) * len(num_options)
+    assert stream.get_score() == game.get_score()
+    assert stream.get_max_possible_score() == game.get_max_possible_score()
+    assert np.array_equal(stream.get_score_summary().counts, game.get_score_summary().counts)
+
+
+def test_dual_and_restart():
+    game = NBackGame(2, 10, 8, 5, seed=3)
+    game.generate_sequences()
+    stream = StreamingNBackGame(2, 8, 5, seed=3, max_trials=12, accuracy_window=4)
+    first = [stream.next_stimuli() for _ in range(12)]
+    assert first == [tuple(row) for row in game.stimuli.tolist()]
+    stream.record_response_and_score(True, False)
+    stream.generate_sequences()
+    assert stream.get_current_trial_number() == 0 and stream.get_score() == 0
+    assert stream.rolling_accuracy() is None and len(stream._correct_window) == 4
+    assert [stream.next_stimuli() for _ in range(12)] == first
@@ -0,0 +1,30 @@
+import sys
+import threading
+
+from app.tracing import Tracer
+
+
+def test_record_from_several_threads():
+    tracer = Tracer(capacity=1000)
+    per_thread = 20_000
+
+    def record(name):
+        for _ in range(per_thread):
+            tracer.instant(name)
+
+    threads = [threading.Thread(target=record, args=(f"worker {index}",)) for index in range(4)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert tracer.count == 4 * per_thread
+    events = tracer.trace_events()
+    assert len(events) == tracer.capacity
+    # Each thread keeps one id, so every event's thread matches the worker that recorded it
+    assert len({(event["tid"], event["name"]) for event in events}) == len({event["tid"] for event in events})
+    assert {event["tid"] for event in events} <= {0, 1, 2, 3}